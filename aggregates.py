@@ -0,0 +1,205 @@
+# aggregates.py
+# Agregados incrementais do DailyHUD: soma/contagem/mín/máx por métrica no bucket corrente de
+# cada período (WTD/MTD/QTD/YTD/TOTAL) + janela móvel de 7 dias. Um dia novo custa O(1);
+# a virada de semana/mês/trimestre/ano zera o bucket. Se qualquer linha já ingerida mudar, refaz
+# tudo: com a linhagem do snapshot de gsheets_io (só muda quando linhas salvas mudam) basta conferir
+# nº de linhas + hash da última ingerida, O(1); frames sem linhagem (sem cache) caem no fingerprint
+# de todas as linhas (como turtle._fingerprint), O(histórico).
+from __future__ import annotations
+from typing import Dict, List, Optional
+import datetime as dt
+import hashlib
+import numpy as np
+import pandas as pd
+
+from gsheets_io import SHEET_LINEAGE_ATTR
+from local_store import read_frame, write_frame
+from metrics import DailyFrame, period_start
+from schema import DAILY_SCHEMA, to_float64
+from tracing import traced
+
+AGG_NS = "aggregates"
+BUCKET_PERIODS = ("WTD", "MTD", "QTD", "YTD", "TOTAL")
+WINDOW_DAYS = 7  # período "7D"
+
+class Acc:
+    """Acumulador por coluna: soma e contagem (não-NaN), mín, máx e nº de linhas."""
+    def __init__(self, k: int):
+        self.sum = np.zeros(k)
+        self.count = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+        self.rows = 0
+
+    def add(self, v: np.ndarray) -> None:
+        valid = ~np.isnan(v)
+        self.sum += np.where(valid, v, 0.0)
+        self.count += valid
+        self.min = np.fmin(self.min, v)
+        self.max = np.fmax(self.max, v)
+        self.rows += 1
+
+    def add_block(self, m: np.ndarray) -> None:
+        """Várias linhas de uma vez (matriz linhas x colunas)."""
+        if not len(m):
+            return
+        valid = ~np.isnan(m)
+        self.sum += np.where(valid, m, 0.0).sum(axis=0)
+        self.count += valid.sum(axis=0)
+        with np.errstate(all="ignore"):
+            self.min = np.fmin(self.min, np.nanmin(np.where(valid, m, np.inf), axis=0))
+            self.max = np.fmax(self.max, np.nanmax(np.where(valid, m, -np.inf), axis=0))
+        self.rows += len(m)
+
+    def merge(self, other: "Acc") -> None:
+        self.sum += other.sum
+        self.count += other.count
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self.rows += other.rows
+
+class PeriodAggregates:
+    """
+    Estado persistido (pickle em .hud_cache/aggregates): um Acc por período no bucket corrente
+    (com a data de início do bucket) e um Acc por dia para os últimos WINDOW_DAYS dias.
+    """
+    def __init__(self, cols: List[str]):
+        self.cols = list(cols)
+        self.pos = {c: i for i, c in enumerate(self.cols)}
+        self.n_rows = 0
+        self.fingerprint = ""   # de todas as linhas ingeridas (só sem linhagem)
+        self.lineage: Optional[str] = None
+        self.last_hash = ""     # hash da última linha ingerida
+        self.last_day: Optional[dt.date] = None
+        self.buckets: Dict[str, Acc] = {}
+        self.starts: Dict[str, Optional[dt.date]] = {}
+        self.recent: Dict[dt.date, Acc] = {}
+        self.rebuilds = 0
+
+    # ---------- ingestão ----------
+    def _roll(self, day: dt.date) -> None:
+        """Abre bucket novo nos períodos cuja data de início mudou (virada de semana/mês/...)."""
+        for p in BUCKET_PERIODS:
+            start = period_start(p, day)
+            if p not in self.buckets or self.starts[p] != start:
+                self.buckets[p], self.starts[p] = Acc(len(self.cols)), start
+        self.recent = {d: a for d, a in self.recent.items() if (day - d).days < WINDOW_DAYS}
+
+    def add_row(self, day: dt.date, v: np.ndarray) -> None:
+        """Um dia novo (ou mais uma linha do mesmo dia): O(nº de colunas)."""
+        self._roll(day)
+        for acc in self.buckets.values():
+            acc.add(v)
+        self.recent.setdefault(day, Acc(len(self.cols))).add(v)
+        self.last_day = day
+
+    def rebuild(self, days: np.ndarray, mat: np.ndarray) -> None:
+        """Recalcula do zero: só as linhas do bucket corrente de cada período (vetorizado)."""
+        self.buckets, self.starts, self.recent = {}, {}, {}
+        self.last_day = None
+        self.rebuilds += 1
+        if not len(days):
+            return
+        last = pd.Timestamp(days[-1]).date()
+        self._roll(last)
+        for p in BUCKET_PERIODS:
+            start = self.starts[p]
+            lo = 0 if start is None else int(np.searchsorted(days, np.datetime64(start, "D"), side="left"))
+            self.buckets[p].add_block(mat[lo:])
+        lo = int(np.searchsorted(days, np.datetime64(last - dt.timedelta(days=WINDOW_DAYS - 1), "D"), side="left"))
+        for i in range(lo, len(days)):
+            self.recent.setdefault(pd.Timestamp(days[i]).date(), Acc(len(self.cols))).add(mat[i])
+        self.last_day = last
+
+    # ---------- consulta ----------
+    def stats(self, period: str, today: dt.date) -> Acc:
+        """Acumulado do período relativo a `today` (bucket vazio se ainda não houve linha nele)."""
+        if period == "7D":
+            out = Acc(len(self.cols))
+            for d, acc in self.recent.items():
+                if 0 <= (today - d).days < WINDOW_DAYS:
+                    out.merge(acc)
+            return out
+        if period in self.buckets and self.starts[period] == period_start(period, today):
+            return self.buckets[period]
+        return Acc(len(self.cols))
+
+def _row_hashes(dd: DailyFrame, cols: List[str], lo: int = 0, hi: Optional[int] = None) -> np.ndarray:
+    """Hash por linha (lo:hi) de 'Data' + colunas agregadas (vetorizado)."""
+    return pd.util.hash_pandas_object(dd.df.iloc[lo:hi][["Data"] + cols], index=False).to_numpy()
+
+def _row_hash(dd: DailyFrame, cols: List[str], i: int) -> str:
+    """Hash de uma linha ('Data' + colunas agregadas), estável entre processos."""
+    row = dd.df.iloc[i]
+    return hashlib.sha1(repr([row[c] for c in ["Data"] + cols]).encode("utf-8")).hexdigest()
+
+def _fingerprint(cols: List[str], hashes: np.ndarray) -> str:
+    """Fingerprint das linhas já ingeridas (qualquer edição no histórico muda o valor)."""
+    h = hashlib.sha1(repr(cols).encode("utf-8"))
+    h.update(hashes.tobytes())
+    return h.hexdigest()
+
+def _intact(agg: PeriodAggregates, dd: DailyFrame, cols: List[str], lineage: Optional[str]) -> bool:
+    """As agg.n_rows primeiras linhas de `dd` são as já ingeridas?"""
+    n = len(dd.df)
+    if not 0 < agg.n_rows <= n:
+        return False
+    if lineage is not None:
+        # mesma linhagem = só houve linhas acrescentadas na aba; a última ingerida no mesmo lugar
+        # garante que nenhuma nova (com data anterior) entrou no meio da ordenação
+        return agg.lineage == lineage and _row_hash(dd, cols, agg.n_rows - 1) == agg.last_hash
+    return _fingerprint(cols, _row_hashes(dd, cols, 0, agg.n_rows)) == agg.fingerprint
+
+def _mark(agg: PeriodAggregates, dd: DailyFrame, cols: List[str], lineage: Optional[str]) -> None:
+    """Registra o que foi ingerido (nº de linhas, hash da última e linhagem ou fingerprint)."""
+    n = len(dd.df)
+    agg.n_rows, agg.lineage = n, lineage
+    agg.last_hash = _row_hash(dd, cols, n - 1) if n else ""
+    agg.fingerprint = "" if lineage is not None else _fingerprint(cols, _row_hashes(dd, cols))
+
+def _matrix(dd: DailyFrame, cols: List[str], lo: int = 0) -> np.ndarray:
+    """Linhas lo: do DailyFrame como matriz float64 (mesma conversão de DailyFrame.num)."""
+    part = dd.df.iloc[lo:]
+    return np.column_stack([to_float64(part[c]).to_numpy(dtype=float) for c in cols]) if cols else np.empty((len(part), 0))
+
+def sync_aggregates(agg: Optional[PeriodAggregates], dd: DailyFrame) -> PeriodAggregates:
+    """
+    Leva `agg` até as linhas atuais do DailyFrame: se as linhas já ingeridas estão intactas
+    (_intact), ingere só as novas; senão (histórico editado/removido) refaz tudo.
+    """
+    cols = [c for c in DAILY_SCHEMA if c != "Data" and dd.has(c)]
+    days = dd._days.astype("datetime64[D]")
+    n = len(days)
+    lineage = dd.source.attrs.get(SHEET_LINEAGE_ATTR)
+    if agg is None or agg.cols != cols:
+        agg = PeriodAggregates(cols)
+    elif _intact(agg, dd, cols, lineage):
+        if n > agg.n_rows:
+            new = _matrix(dd, cols, agg.n_rows)
+            for i in range(agg.n_rows, n):
+                agg.add_row(pd.Timestamp(days[i]).date(), new[i - agg.n_rows])
+            _mark(agg, dd, cols, lineage)
+        return agg
+    agg.rebuild(days, _matrix(dd, cols))
+    _mark(agg, dd, cols, lineage)
+    return agg
+
+@traced
+def attach_aggregates(key: str, dd: DailyFrame) -> Optional[PeriodAggregates]:
+    """
+    Carrega o estado salvo (chave = planilha), sincroniza com `dd`, grava se mudou e o anexa ao
+    DailyFrame (as métricas de período passam a ler dele). HUD "as of" no passado não usa o store.
+    """
+    if dd.empty or not dd.has_dates:
+        return None
+    saved = read_frame(AGG_NS, key)
+    if not isinstance(saved, PeriodAggregates) or not hasattr(saved, "lineage"):
+        saved = None  # ausente ou de formato antigo: refaz
+    elif saved.last_day is not None and saved.last_day > dd.today:
+        return None  # estado à frente do "as of" pedido: usa o cálculo direto
+    before = (saved.n_rows, saved.last_hash, saved.lineage, saved.fingerprint, saved.rebuilds) if saved else None
+    agg = sync_aggregates(saved, dd)
+    if (agg.n_rows, agg.last_hash, agg.lineage, agg.fingerprint, agg.rebuilds) != before:
+        write_frame(AGG_NS, key, agg)
+    dd.aggregates = agg
+    return agg
@@ -0,0 +1,288 @@
+# backfill.py
+# Histórico do HUD: calcula as métricas numéricas de um intervalo de datas numa única passada
+# (posições por dia de calendário vetorizadas; a soma de cada janela data x período é reduzida
+# direto sobre a fatia, com o mesmo arredondamento do HUD "as of") e grava numa tabela local
+# (.hud_cache/history). Equivale a gerar o HUD "as of" cada data, sem N execuções completas.
+from __future__ import annotations
+from typing import Dict, List, Optional
+import datetime as dt
+import numpy as np
+import pandas as pd
+
+from local_store import read_frame, write_frame
+from market_provider import PERIODS, MarketData, adjust_level, fmt_pct, prices_as_of
+from metrics import (
+    DailyFrame, RunningFrame, RUN_PERIODS, INSIGHTS_METRICS, INSIGHTS_PERIODS,
+    format_insights_table_md, hours_to_hhmm, int_fmt, minutes_to_mmss, num_fmt,
+)
+from tracing import traced
+
+HISTORY_NS = "history"
+
+def target_dates(start: dt.date, end: dt.date) -> pd.DatetimeIndex:
+    return pd.date_range(start, end, freq="D", name="Data")
+
+def _period_starts(targets: pd.DatetimeIndex, period: str) -> np.ndarray:
+    """Início de `period` para cada data (datetime64[D]); TOTAL = sem limite."""
+    if period == "7D":
+        s = targets - pd.Timedelta(days=6)
+    elif period == "WTD":
+        s = targets - pd.to_timedelta(targets.weekday, unit="D")
+    elif period in ("MTD", "QTD", "YTD"):
+        s = targets.to_period({"MTD": "M", "QTD": "Q", "YTD": "Y"}[period]).start_time
+    elif period == "12M":
+        s = targets - pd.Timedelta(days=365)
+    else:
+        return np.full(len(targets), np.datetime64("1900-01-01", "D"))
+    return s.to_numpy().astype("datetime64[D]")
+
+class _DayPrefix:
+    """Contagens acumuladas por dia de calendário a partir de `day0` (linhas podem repetir dia)."""
+    def __init__(self, days: np.ndarray, day0: np.datetime64, n_days: int):
+        self.day0, self.n = day0, n_days
+        self.ri = (days - day0).astype(np.int64)  # dia de cada linha (ordenado)
+        self.rows = self._prefix(np.ones(len(self.ri)))
+
+    def _prefix(self, weights: np.ndarray) -> np.ndarray:
+        return np.concatenate(([0.0], np.cumsum(np.bincount(self.ri, weights=weights, minlength=self.n))))
+
+    def pos(self, dates: np.ndarray) -> np.ndarray:
+        """Nº de dias do calendário <= data (índice no prefixo), limitado a [0, n]."""
+        return np.clip((dates - self.day0).astype(np.int64) + 1, 0, self.n)
+
+    def window(self, values: np.ndarray, lo: np.ndarray, hi: np.ndarray, dropna: bool = False):
+        """
+        (soma, contagem) dos valores não-NaN em cada janela de dias [lo, hi). Contagens por prefixo
+        (inteiras, exatas); somas reduzidas direto em cada fatia — diferença de prefixos acumula erro
+        de ponto flutuante e vira o arredondamento exibido em empates (ex.: meio minuto).
+        `dropna`: soma só os válidos compactados (como Series.dropna().mean()); senão NaN vira 0
+        (como Series.sum()/mean()).
+        """
+        valid = ~np.isnan(values)
+        c = self._prefix(valid.astype(float))
+        rlo = np.searchsorted(self.ri, lo, side="left")  # linhas dos dias [lo, hi)
+        rhi = np.searchsorted(self.ri, hi, side="left")
+        if dropna:
+            vals, pos = values[valid], np.concatenate(([0], np.cumsum(valid)))
+            rlo, rhi = pos[rlo], pos[rhi]
+        else:
+            vals = np.where(valid, values, 0.0)
+        s = np.array([vals[a:b].sum() for a, b in zip(rlo, rhi)], dtype=float)
+        return s, c[hi] - c[lo]
+
+    def mean(self, values: np.ndarray, lo: np.ndarray, hi: np.ndarray, dropna: bool = False) -> np.ndarray:
+        s, c = self.window(values, lo, hi, dropna)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(c > 0, s / c, np.nan)
+
+    def last_row(self, dates: np.ndarray) -> np.ndarray:
+        """Posição da última linha com dia <= data (-1 se nenhuma)."""
+        return np.searchsorted(self.ri, (dates - self.day0).astype(np.int64), side="right") - 1
+
+def _take(values: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    out = np.full(len(idx), np.nan)
+    ok = idx >= 0
+    out[ok] = values[idx[ok]]
+    return out
+
+def _streak_current(ok_day: np.ndarray, upto: np.ndarray) -> np.ndarray:
+    """Streak atual (sequência mais recente de dias ok até cada posição), como streak_days()[0]."""
+    k = np.arange(len(ok_day))
+    csum = np.cumsum(ok_day)
+    run = csum - np.maximum.accumulate(np.where(ok_day, 0, csum))  # tamanho da sequência terminando em k
+    last_ok = np.maximum.accumulate(np.where(ok_day, k, -1))
+    out = np.zeros(len(upto), dtype=np.int64)
+    has = upto >= 0
+    lk = last_ok[upto[has]]
+    out[has] = np.where(lk >= 0, run[np.maximum(lk, 0)], 0)
+    return out
+
+@traced
+def daily_history(daily: pd.DataFrame, targets: pd.DatetimeIndex) -> pd.DataFrame:
+    """Campos de saúde (chaves do mapping) + tabela de insights para cada data de `targets`."""
+    out = pd.DataFrame(index=targets)
+    d = DailyFrame(daily, targets[-1].date())
+    if d.empty:
+        return out
+    days = d._days.astype("datetime64[D]")
+    pf = _DayPrefix(days, days[0], int((days[-1] - days[0]).astype(np.int64)) + 1)
+    t = targets.to_numpy().astype("datetime64[D]")
+    hi = pf.pos(t)
+    lo = {p: pf.pos(_period_starts(targets, p) - np.timedelta64(1, "D")) for p in ("7D", "WTD", "MTD", "QTD", "YTD", "TOTAL")}
+
+    def col(c: str) -> np.ndarray:
+        return d.num(c).to_numpy(dtype=float) if d.has(c) else np.full(len(d.df), np.nan)
+
+    def raw(c: str) -> np.ndarray:
+        """Valor guardado (dtype compacto, sem o arredondamento de to_float64) — o que health_fields lê da linha."""
+        return pd.to_numeric(d.df[c], errors="coerce").to_numpy(dtype=float) if d.has(c) else np.full(len(d.df), np.nan)
+
+    # Última linha (e a de ontem, se houver) — como health_fields
+    last = pf.last_row(t)
+    y = pf.last_row(t - np.timedelta64(1, "D"))
+    y = np.where((y >= 0) & (pf.ri[np.maximum(y, 0)] == (t - pf.day0).astype(np.int64) - 1), y, last)
+    bb_max, bb_end = _take(raw("Body Battery (máx)"), last), _take(raw("Body Battery (end)"), last)
+    out["ENERGY_PCT"] = np.trunc(np.where(np.isnan(bb_max), bb_end, bb_max))
+    out["SONO_HORAS"] = _take(raw("Sono (h)"), last)
+    out["SONO_SCORE"] = _take(raw("Sono (score)"), last)
+    out["KCAL_DIA_ONTEM"] = _take(raw("Calorias (total dia)"), y)
+    out["PASSOS_ONTEM"] = _take(raw("Passos"), y)
+
+    if d.has("Stress (média)"):
+        out["STRESS_SCORE"] = pf.mean(col("Stress (média)"), lo["WTD"], hi)
+    if d.has("Breathwork (min)"):
+        bw = col("Breathwork (min)")
+        s, _ = pf.window(bw, lo["7D"], hi)
+        rows = pf.rows[hi] - pf.rows[lo["7D"]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["MEDIT_MIN"] = np.where(rows > 0, np.round(s / rows), 0)
+        ok_day = np.bincount(pf.ri, weights=(bw > 0).astype(float), minlength=pf.n) > 0
+        out["MEDIT_STREAK"] = _streak_current(ok_day, hi - 1)
+    if d.has("Sono (h)"):
+        for p in ("7D", "MTD", "QTD", "YTD"):
+            out[f"SONO_{p}_H"] = pf.mean(col("Sono (h)"), lo[p], hi)
+
+    # Tabela de insights: "INSIGHTS|<rótulo>|<período>"
+    for name, c, mode, _ in INSIGHTS_METRICS:
+        if not d.has(c):
+            continue
+        v = col(c)
+        for p in INSIGHTS_PERIODS:
+            s, n = pf.window(v, lo[p], hi)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[f"INSIGHTS|{name}|{p}"] = np.where(n > 0, s if mode == "sum" else s / n, np.nan)
+    return out
+
+@traced
+def running_history(acts: pd.DataFrame, targets: pd.DatetimeIndex) -> pd.DataFrame:
+    """Última sessão, VO2 e pace médio por período (min/km) para cada data."""
+    out = pd.DataFrame(index=targets)
+    rf = RunningFrame(acts, targets[-1].date())
+    if rf.empty:
+        return out
+    t = targets.to_numpy().astype("datetime64[D]")
+    days = rf.daily["DataDay"].to_numpy().astype("datetime64[D]")
+    pf = _DayPrefix(days, days[0], int((days[-1] - days[0]).astype(np.int64)) + 1)
+    hi = pf.pos(t)
+    pace = rf.daily["pace_num"].to_numpy(dtype=float)
+    for key, p in RUN_PERIODS.items():
+        out[f"PACE_{key}"] = pf.mean(pace, pf.pos(_period_starts(targets, p) - np.timedelta64(1, "D")), hi, dropna=True)
+    vo2 = rf.daily["vo2_mean"].to_numpy(dtype=float)
+    last_vo2 = np.maximum.accumulate(np.where(~np.isnan(vo2), np.arange(len(vo2)), -1))
+    li = pf.last_row(t)
+    out["VO2MAX"] = _take(vo2, np.where(li >= 0, last_vo2[np.maximum(li, 0)], -1))
+
+    runs = rf.runs
+    run_days = runs["Data"].to_numpy().astype("datetime64[D]")
+    last = np.searchsorted(run_days, t, side="right") - 1
+    out["RUN_DATA"] = pd.Series(run_days[np.maximum(last, 0)], index=targets).where(last >= 0)
+    for key, c in (("RUN_DIST", "Distância (km)"), ("RUN_FC_MEDIA", "FC Média")):
+        if c in runs.columns:
+            out[key] = _take(pd.to_numeric(runs[c], errors="coerce").to_numpy(dtype=float), last)
+    return out
+
+@traced
+def market_history(md: MarketData, targets: pd.DatetimeIndex) -> pd.DataFrame:
+    """Retornos D1..12M (frações) e níveis por ativo para cada data, como MarketData.returns_table."""
+    out: Dict[str, np.ndarray] = {}
+    prices = prices_as_of(md._prices, targets[-1].date())
+    if prices is None or prices.empty:
+        return pd.DataFrame(index=targets)
+    prices = prices.sort_index()
+    t = targets.to_numpy().astype("datetime64[D]")
+    starts = {p: _period_starts(targets, p) for p in PERIODS if p != "D1"}
+    day_index = prices.index.normalize()
+    day_index = (day_index.tz_localize(None) if day_index.tz is not None else day_index).to_numpy().astype("datetime64[D]")
+    for key, ticker in md.tickers.items():
+        if ticker not in prices.columns:
+            continue
+        s = prices[ticker].to_numpy(dtype=float)
+        ok = ~np.isnan(s)
+        vd, vv = day_index[ok], s[ok]               # só barras válidas do ativo
+        j = np.searchsorted(vd, t, side="right") - 1  # última barra <= data
+        last, prev = _take(vv, j), _take(vv, np.where(j >= 1, j - 1, -1))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[f"{key}_D1"] = np.where(prev != 0, last / prev - 1.0, np.nan)
+            for p, st in starts.items():
+                k = np.searchsorted(vd, st, side="left")  # 1ª barra em/após o início do período
+                v0 = _take(vv, np.where(k <= j, k, -1))
+                out[f"{key}_{p}"] = np.where(v0 != 0, last / v0 - 1.0, np.nan)
+        out[f"{key}_NIVEL"] = adjust_level(key, last)  # mesmo ajuste de MarketData.last_level
+    return pd.DataFrame(out, index=targets)
+
+def backfill_history(sheets: Dict[str, pd.DataFrame], start: dt.date, end: dt.date,
+                     md: Optional[MarketData] = None) -> pd.DataFrame:
+    """Tabela (linhas=datas, colunas=métricas numéricas) de `start` a `end`, numa passada."""
+    from hud_core import prepare_frames  # evita import circular
+    targets = target_dates(start, end)
+    daily, acts = prepare_frames(sheets)
+    parts: List[pd.DataFrame] = [daily_history(daily, targets), running_history(acts, targets)]
+    if md is not None:
+        parts.append(market_history(md, targets))
+    return pd.concat(parts, axis=1)
+
+# ---------- Conferência com o HUD "as of" ----------
+def _opt(v) -> Optional[float]:
+    return None if pd.isna(v) else float(v)
+
+def history_mapping(row: pd.Series) -> Dict[str, str]:
+    """Linha do histórico formatada como no mapping do HUD (só as chaves que o histórico tem)."""
+    from hud_core import LEVEL_FORMATS, fmt_level
+    out: Dict[str, str] = {}
+    fmts = {
+        "ENERGY_PCT": lambda v: str(int(v)) if v is not None else "-",
+        "SONO_HORAS": lambda v: num_fmt(v, 1), "SONO_SCORE": lambda v: num_fmt(v, 0),
+        "KCAL_DIA_ONTEM": int_fmt, "PASSOS_ONTEM": int_fmt, "STRESS_SCORE": lambda v: num_fmt(v, 2),
+        "MEDIT_MIN": lambda v: str(int(v)), "MEDIT_STREAK": lambda v: str(int(v)),
+        "VO2MAX": lambda v: num_fmt(v, 0),
+        "RUN_DIST": lambda v: num_fmt(v, 2) if v is not None else "-",
+        "RUN_FC_MEDIA": lambda v: num_fmt(v, 0) if v is not None else "-",
+    }
+    for k, v in row.items():
+        if k.startswith("INSIGHTS|"):
+            continue
+        if k == "RUN_DATA":
+            out[k] = pd.Timestamp(v).date().isoformat() if pd.notna(v) else "-"
+        elif k in fmts:
+            out[k] = fmts[k](_opt(v))
+        elif k.startswith("SONO_") and k.endswith("_H"):
+            out[k] = hours_to_hhmm(_opt(v))
+        elif k.startswith("PACE_"):
+            out[k] = minutes_to_mmss(_opt(v))
+        elif k.endswith("_NIVEL"):
+            if k[:-6] in LEVEL_FORMATS:
+                out[k] = fmt_level(k[:-6], _opt(v))
+        else:
+            out[k] = fmt_pct(v) if pd.notna(v) else "-"  # retornos de mercado
+    ins = {tuple(k.split("|")[1:]): v for k, v in row.items() if k.startswith("INSIGHTS|")}
+    if ins:
+        values = pd.Series(ins).unstack().reindex(index=[m[0] for m in INSIGHTS_METRICS], columns=INSIGHTS_PERIODS)
+        out["INSIGHTS_TABLE_MD"] = format_insights_table_md(values.astype(float))
+    return out
+
+def verify_history(cfg, client, hist: pd.DataFrame, dates=None, cache=None) -> List[str]:
+    """
+    Compara, célula a célula, o histórico com o mapping de build_hud_context(as_of=data) para cada
+    data de `dates` (padrão: todas). Retorna as divergências ("data CHAVE: histórico != HUD").
+    """
+    from hud_core import build_hud_context
+    diffs: List[str] = []
+    for t in (hist.index if dates is None else pd.DatetimeIndex(dates)):
+        mapping = build_hud_context(cfg, client, cache, as_of=t.date()).mapping
+        for k, got in history_mapping(hist.loc[t]).items():
+            if k in mapping and mapping[k] != got:
+                diffs.append(f"{t.date()} {k}: {got!r} != {mapping[k]!r}")
+    return diffs
+
+# ---------- Tabela local ----------
+def load_history(key: str) -> pd.DataFrame:
+    hist = read_frame(HISTORY_NS, key)
+    return hist if isinstance(hist, pd.DataFrame) else pd.DataFrame()
+
+def save_history(key: str, rows: pd.DataFrame) -> pd.DataFrame:
+    """Mescla `rows` na tabela salva (datas recalculadas substituem as antigas) e grava."""
+    hist = load_history(key)
+    if not hist.empty:
+        rows = pd.concat([hist.loc[~hist.index.isin(rows.index)], rows]).sort_index()
+    write_frame(HISTORY_NS, key, rows)
+    return rows
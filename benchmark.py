@@ -0,0 +1,260 @@
+# benchmark.py
+# Benchmark offline do pipeline do HUD: replay de fixtures sintéticas (Sheets, Yahoo diário e
+# barras de 1 min, RSS, TradingEconomics, Notion) sem rede. Mede latência e pico de memória por estágio.
+#   python benchmark.py --years 1 5 20 --repeat 5 [--json bench.json]
+from __future__ import annotations
+from typing import Any, Callable, Dict, List
+from unittest import mock
+import argparse
+import datetime as dt
+import json
+import statistics
+import tempfile
+import time
+import tracemalloc
+import types
+
+import numpy as np
+import pandas as pd
+
+import gsheets_io
+import http_client
+import local_store
+import market_provider
+from market_provider import BRT, MarketData, fetch_latest_news, fetch_macro_events, today_brt
+from intraday import IntradayMarket, ReplayQuotes
+from hud_core import SHEET_TABS, context_from_sources, prepare_frames, health_fields, running_fields
+from metrics import DailyFrame, RunningFrame
+from notion_client import push_code_blocks
+from schema import apply_schemas
+
+INTRADAY_BARS = 480  # 8h de pregão
+INTRADAY_STEP = 5    # barras novas por poll
+STAGES = ["load", "metrics", "market", "intraday", "news", "agenda", "render", "publish"]
+
+# ---------- Fixtures ----------
+RSS_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Fixture</title>
+{items}
+</channel></rss>"""
+RSS_ITEM = "<item><title>Notícia {i}</title><link>https://example.com/{i}</link><pubDate>{date}</pubDate></item>"
+
+def _daily_values(days: pd.DatetimeIndex, rng: np.random.Generator) -> List[List[Any]]:
+    n = len(days)
+    cols = {
+        "Data": days.strftime("%Y-%m-%d"),
+        "Sono (h)": rng.uniform(5, 9, n).round(2), "Sono Deep (h)": rng.uniform(0.5, 2, n).round(2),
+        "Sono REM (h)": rng.uniform(1, 2.5, n).round(2), "Sono Light (h)": rng.uniform(2, 5, n).round(2),
+        "Sono (score)": rng.integers(50, 100, n), "Body Battery (máx)": rng.integers(40, 100, n),
+        "Body Battery (end)": rng.integers(5, 60, n), "Stress (média)": rng.integers(15, 60, n),
+        "Passos": rng.integers(2000, 20000, n), "Calorias (total dia)": rng.integers(1800, 3500, n),
+        "Corrida (km)": np.where(rng.random(n) < 0.4, rng.uniform(3, 15, n).round(2), 0),
+        "Pace (min/km)": rng.uniform(4.5, 6.5, n).round(2),
+        "Breathwork (min)": np.where(rng.random(n) < 0.7, rng.integers(5, 20, n), 0),
+    }
+    header = list(cols)
+    rows = [[str(v) for v in row] for row in zip(*cols.values())]
+    return [header] + rows
+
+def _activities_values(days: pd.DatetimeIndex, rng: np.random.Generator) -> List[List[Any]]:
+    when = days.repeat(2)
+    n = len(when)
+    tipo = rng.choice(["running", "cycling", "strength_training", "walking"], n)
+    km = rng.uniform(2, 20, n).round(2)
+    dur = (km * rng.uniform(4.5, 7, n)).round(1)
+    header = ["Data", "Tipo", "Distância (km)", "Duração (min)", "FC Média", "VO2 Máx", "Pace (min/km)"]
+    rows = [[d.strftime("%Y-%m-%d"), t, str(k), str(m), str(rng.integers(120, 170)), "52", str(round(m / k, 2))]
+            for d, t, k, m in zip(when, tipo, km, dur)]
+    return [header] + rows
+
+def _turtle_values(days: pd.DatetimeIndex) -> List[List[Any]]:
+    return [["Data", "Objetivo"]] + [[d.strftime("%d/%m/%Y"), f"Objetivo {i}"] for i, d in enumerate(days)]
+
+def build_fixtures(years: int, seed: int = 7) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(end=pd.Timestamp(today_brt()), periods=365 * years, freq="D")
+    now = dt.datetime.now(dt.timezone.utc)
+    prices_idx = pd.bdate_range(end=pd.Timestamp(today_brt()), periods=400)
+    return {
+        "sheets": {
+            "DailyHUD": _daily_values(days, rng),
+            "Activities": _activities_values(days, rng),
+            "Turtle": _turtle_values(days),
+        },
+        "prices": pd.DataFrame(
+            np.exp(np.cumsum(rng.normal(0, 0.01, (len(prices_idx), 10)), axis=0)) * 100,
+            index=prices_idx,
+        ),
+        "rss": RSS_XML.format(items="\n".join(
+            RSS_ITEM.format(i=i, date=(now - dt.timedelta(minutes=7 * i)).strftime("%a, %d %b %Y %H:%M:%S +0000"))
+            for i in range(50))).encode("utf-8"),
+        "minute": pd.DataFrame(  # pregão de hoje em barras de 1 min (fator sobre o último fechamento)
+            np.exp(np.cumsum(rng.normal(0, 0.0005, (INTRADAY_BARS, 10)), axis=0)),
+            index=pd.date_range(pd.Timestamp(today_brt()).tz_localize(BRT) + pd.Timedelta(hours=9),
+                                periods=INTRADAY_BARS, freq="min"),
+        ),
+        "te": [
+            {"CalendarId": i, "Country": "Brazil" if i % 2 else "United States",
+             "DateUtc": (now + dt.timedelta(hours=i - 6)).strftime("%Y-%m-%dT%H:%M:%S"),
+             "Event": f"Evento {i}", "Forecast": "0.3%", "Previous": "0.2%"}
+            for i in range(12)
+        ],
+    }
+
+# ---------- Fakes (sem rede) ----------
+class _FakeSpreadsheet:
+    def __init__(self, grids: Dict[str, List[List[Any]]]):
+        self.grids = grids
+
+    def values_batch_get(self, ranges, params=None):
+        out = []
+        for rg in ranges:
+            name, _, a1 = rg.partition("!")
+            grid = self.grids[name.strip("'").replace("''", "'")]
+            if a1 == "A:A":
+                grid = [row[:1] for row in grid]
+            elif a1:
+                lo, hi = (int(x) for x in a1.split(":"))
+                grid = grid[lo - 1:hi]
+            out.append({"values": grid})
+        return {"valueRanges": out}
+
+class _FakeClient:
+    def __init__(self, grids):
+        self.sheet = _FakeSpreadsheet(grids)
+
+    def open_by_key(self, key):
+        return self.sheet
+
+class _FakeResponse:
+    def __init__(self, status_code=200, content=b"", data=None):
+        self.status_code, self.content, self._data = status_code, content, data
+        self.headers: Dict[str, str] = {}
+        self.text = content.decode("utf-8", "ignore")
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        pass
+
+def _fake_request(fx):
+    def _request(method, url, **kwargs):
+        if "tradingeconomics" in url:
+            return _FakeResponse(data=fx["te"])
+        if "notion" in url:
+            return _FakeResponse(200)
+        return _FakeResponse(200, content=fx["rss"])
+    return _request
+
+def _fake_yf_close(fx):
+    def _close(tickers, start):
+        prices = fx["prices"]
+        out = pd.DataFrame({t: prices.iloc[:, i % prices.shape[1]] for i, t in enumerate(tickers)})
+        return out[out.index.date >= start]
+    return _close
+
+def _minute_bars(fx, tickers: List[str]) -> pd.DataFrame:
+    last = fx["prices"].iloc[-2].to_numpy()
+    minute = fx["minute"]
+    return pd.DataFrame({t: minute.iloc[:, i % minute.shape[1]] * last[i % len(last)] for i, t in enumerate(tickers)})
+
+def _cfg():
+    return types.SimpleNamespace(
+        gsheet_id="bench", win_ticker="WIN=F", wdo_ticker="WDO=F", te_api_key="guest:guest",
+        cga_status="-", estudo_min_hoje="-", livro_titulo="-", livro_pag_atual="-", livro_pag_total="-",
+        livro_progresso="-", loss_max_r="-", pause_trigger_regra="-", lazer_streak="0",
+        link_garmin="-", link_notion="-", link_fundscreener="-", link_swm="-",
+    )
+
+# ---------- Execução ----------
+def run_once(fx: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+    """Monta os estágios (cada um depende só dos anteriores) para uma execução."""
+    cfg, client = _cfg(), _FakeClient(fx["sheets"])
+    state: Dict[str, Any] = {}
+
+    def load():
+        state["sheets"] = apply_schemas(gsheets_io.load_sheets(client, cfg.gsheet_id, SHEET_TABS, use_cache=False))
+
+    def metrics():
+        daily, acts = prepare_frames(state["sheets"])
+        dd, rf = DailyFrame(daily), RunningFrame(acts)
+        health_fields(dd), running_fields(rf)
+
+    def market():
+        state["market"] = MarketData(win_ticker=cfg.win_ticker, wdo_ticker=cfg.wdo_ticker)
+        state["market"].returns_table()
+
+    def intraday():
+        md = state["market"]
+        live = IntradayMarket(md, source=ReplayQuotes(_minute_bars(fx, list(md.tickers.values())), step=INTRADAY_STEP))
+        while live.poll():
+            live.returns_table()
+
+    def news():
+        state["news"] = fetch_latest_news(max_items=6)
+
+    def agenda():
+        state["agenda"] = fetch_macro_events(cfg.te_api_key)
+
+    def render():
+        ctx = context_from_sources(cfg, client, {
+            "sheets": state["sheets"], "market": state["market"],
+            "news": state["news"], "agenda": state["agenda"],
+        })
+        state["md"] = ctx.render()
+
+    def publish():
+        push_code_blocks(["bench1", "bench2", "bench3"], state["md"], "token", force=True)
+
+    return dict(zip(STAGES, [load, metrics, market, intraday, news, agenda, render, publish]))
+
+def benchmark(years: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    fx = build_fixtures(years)
+    timings: Dict[str, List[float]] = {s: [] for s in STAGES}
+    peaks: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch.object(local_store, "CACHE_DIR", tmp), \
+            mock.patch.object(http_client, "request", _fake_request(fx)), \
+            mock.patch.object(market_provider, "_yf_close", _fake_yf_close(fx)):
+        for i in range(repeat + 1):
+            stages = run_once(fx)
+            traced = i == repeat  # última rodada só mede memória
+            for name in STAGES:
+                if traced:
+                    tracemalloc.start()
+                t0 = time.perf_counter()
+                stages[name]()
+                elapsed = time.perf_counter() - t0
+                if traced:
+                    peaks[name] = tracemalloc.get_traced_memory()[1] / 2**20
+                    tracemalloc.stop()
+                else:
+                    timings[name].append(elapsed)
+    return {
+        s: {"median_ms": statistics.median(timings[s]) * 1000, "max_ms": max(timings[s]) * 1000,
+            "peak_mib": peaks.get(s, float("nan"))}
+        for s in STAGES
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline do HUD.")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 20], help="Tamanho do histórico sintético.")
+    parser.add_argument("--repeat", type=int, default=5, help="Execuções cronometradas por tamanho.")
+    parser.add_argument("--json", help="Salva o resultado em JSON neste caminho.")
+    args = parser.parse_args()
+
+    report = {}
+    for years in args.years:
+        res = benchmark(years, args.repeat)
+        report[f"{years}y"] = res
+        print(f"\n== {years} ano(s) de histórico ==")
+        print(f"{'estágio':<10} {'mediana (ms)':>13} {'máx (ms)':>10} {'pico (MiB)':>11}")
+        for stage, r in res.items():
+            print(f"{stage:<10} {r['median_ms']:>13.1f} {r['max_ms']:>10.1f} {r['peak_mib']:>11.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
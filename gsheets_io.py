@@ -1,12 +1,21 @@
 # gsheets_io.py
 from __future__ import annotations
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, TYPE_CHECKING
+import hashlib
+import json
+import time
+import uuid
 import pandas as pd
-import gspread
-from gspread_dataframe import get_as_dataframe
-from google.oauth2.service_account import Credentials
+from pandas.io.parsers import TextParser
+from local_store import read_frame, write_frame
+from tracing import span, traced
+
+if TYPE_CHECKING:  # gspread/google-auth só são importados quando usados
+    import gspread
 
 def _authorize_gspread(sa_info: Optional[Dict[str, Any]], sa_file: Optional[str]) -> gspread.Client:
+    import gspread
+    from google.oauth2.service_account import Credentials
     scopes = ["https://www.googleapis.com/auth/spreadsheets"]
     if sa_info:
         creds = Credentials.from_service_account_info(sa_info, scopes=scopes)
@@ -16,11 +25,177 @@ def _authorize_gspread(sa_info: Optional[Dict[str, Any]], sa_file: Optional[str]
         return gspread.authorize(creds)
     raise ValueError("Forneça credenciais do Google (st.secrets['gcp_service_account'] OU env GCP_SERVICE_ACCOUNT_FILE).")
 
+# Handle de planilha reaproveitado (evita open_by_key/metadata a cada aba): um por gsheet_id, do
+# último client usado — client novo substitui o anterior, sem acumular handles nem depender de id()
+_SPREADSHEETS: Dict[str, Tuple["gspread.Client", "gspread.Spreadsheet"]] = {}
+
+def open_spreadsheet(client: gspread.Client, gsheet_id: str) -> gspread.Spreadsheet:
+    hit = _SPREADSHEETS.get(gsheet_id)
+    if hit is None or hit[0] is not client:
+        hit = _SPREADSHEETS[gsheet_id] = (client, client.open_by_key(gsheet_id))
+    return hit[1]
+
+def _values_to_df(values: List[List[Any]]) -> pd.DataFrame:
+    """Converte a grade de valores (1ª linha = header) em DataFrame, como get_as_dataframe."""
+    if not values:
+        return pd.DataFrame()
+    width = max(len(r) for r in values)
+    rows = [list(r) + [""] * (width - len(r)) for r in values]
+    df = TextParser(rows, header=0).read()
+    return df.dropna(how="all")
+
+@traced
 def load_sheet(client: gspread.Client, gsheet_id: str, sheet_name: str) -> pd.DataFrame:
-    ws = client.open_by_key(gsheet_id).worksheet(sheet_name)
+    from gspread_dataframe import get_as_dataframe
+    ws = open_spreadsheet(client, gsheet_id).worksheet(sheet_name)
     df = get_as_dataframe(ws, evaluate_formulas=True, header=0)
     df = df.dropna(how="all")
     return df
 
+def _quote(sheet_name: str) -> str:
+    return "'{}'".format(sheet_name.replace("'", "''"))
+
+# Mesmas opções do get_as_dataframe(evaluate_formulas=True): números crus (sem formatação de
+# locale — "7,25"/"12.345" em planilha pt-BR) e datas como texto formatado.
+VALUE_RENDER_PARAMS = {"valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "FORMATTED_STRING"}
+
+def _batch_values(sh: gspread.Spreadsheet, ranges: List[str]) -> List[List[List[Any]]]:
+    """values_batch_get -> lista de grades (uma por range, na mesma ordem)."""
+    if not ranges:
+        return []
+    with span("gsheets_io.values_batch_get", ranges=len(ranges)):
+        resp = sh.values_batch_get(ranges, params=VALUE_RENDER_PARAMS)
+    value_ranges = resp.get("valueRanges", [])
+    return [value_ranges[i].get("values", []) if i < len(value_ranges) else [] for i in range(len(ranges))]
+
+# ------------------------
+# Snapshot local por aba (detecção de mudança: nº de linhas + hash da última linha)
+# ------------------------
+SHEETS_CACHE_NS = "sheets"
+# Edições em linhas antigas não mudam nº de linhas nem a última linha: a cada N s a aba é
+# rebaixada inteira mesmo assim (a conta de serviço só tem escopo de Sheets, sem modifiedTime do Drive).
+SHEETS_FULL_RESYNC_S = 3600  # >>> MANUAL INPUT (opcional)
+# Linhagem do snapshot (em DataFrame.attrs): muda só quando linhas já salvas mudam (edição/remoção);
+# linhas acrescentadas mantêm a linhagem — quem deriva estado das linhas (aggregates.py) ingere só as novas.
+SHEET_LINEAGE_ATTR = "sheet_lineage"
+
+def _trim(row: List[Any]) -> List[Any]:
+    """A API omite células vazias no fim da linha; normaliza para comparar."""
+    row = list(row)
+    while row and row[-1] in ("", None):
+        row.pop()
+    return row
+
+def _row_hash(row: List[Any]) -> str:
+    return hashlib.sha1(json.dumps(_trim(row), default=str).encode("utf-8")).hexdigest()
+
+def _snapshot_key(gsheet_id: str, sheet_name: str) -> str:
+    return f"{gsheet_id}_{sheet_name}"
+
+def _store_snapshot(gsheet_id: str, sheet_name: str, values: List[List[Any]],
+                    synced_at: Optional[float] = None, lineage: Optional[str] = None) -> pd.DataFrame:
+    """Grava o snapshot; `synced_at` = hora do último download completo (None = agora), `lineage` None = nova."""
+    df = _values_to_df(values)
+    df.attrs[SHEET_LINEAGE_ATTR] = lineage or uuid.uuid4().hex
+    write_frame(SHEETS_CACHE_NS, _snapshot_key(gsheet_id, sheet_name), {
+        "values": values, "frame": df, "last_hash": _row_hash(values[-1]) if values else "",
+        "synced_at": time.time() if synced_at is None else synced_at,
+    })
+    return df
+
+def _kept_lineage(snap: Any, values: List[List[Any]]) -> Optional[str]:
+    """Linhagem do snapshot se o download completo só acrescentou linhas a ele (sem edições)."""
+    if not isinstance(snap, dict) or not isinstance(snap.get("frame"), pd.DataFrame):
+        return None
+    old = snap["values"]
+    if len(values) < len(old) or any(_trim(a) != _trim(b) for a, b in zip(old, values)):
+        return None
+    return snap["frame"].attrs.get(SHEET_LINEAGE_ATTR)
+
+def _needs_full(snap: Any, refresh: bool) -> bool:
+    """Sem snapshot, pedido de refresh ou último download completo há mais de SHEETS_FULL_RESYNC_S."""
+    if refresh or not isinstance(snap, dict):
+        return True
+    return time.time() - snap.get("synced_at", 0.0) > SHEETS_FULL_RESYNC_S
+
+@traced
+def load_sheets(client: gspread.Client, gsheet_id: str, names: List[str], use_cache: bool = True,
+                refresh: bool = False) -> Dict[str, pd.DataFrame]:
+    """
+    Abre a planilha uma vez e lê todas as abas com values_batch_get.
+    Com cache: sonda a coluna A de todas as abas (1 chamada leve) e, por aba,
+    - mesmo nº de linhas  -> baixa só a última linha; hash igual => usa o snapshot local;
+    - linhas a mais       -> baixa só as linhas novas (+ a última salva, para validar);
+    - demais casos        -> baixa a aba inteira.
+    refresh=True (ou snapshot com mais de SHEETS_FULL_RESYNC_S) baixa tudo e regrava o snapshot.
+    Cada aba sai com a linhagem do snapshot em attrs[SHEET_LINEAGE_ATTR] (só com cache).
+    """
+    sh = open_spreadsheet(client, gsheet_id)
+    if not use_cache:
+        return {n: _values_to_df(v) for n, v in zip(names, _batch_values(sh, [_quote(n) for n in names]))}
+
+    snaps = {n: read_frame(SHEETS_CACHE_NS, _snapshot_key(gsheet_id, n)) for n in names}
+    counts = [len(v) for v in _batch_values(sh, [f"{_quote(n)}!A:A" for n in names])]
+
+    ranges, plan = [], {}
+    for n, n_rows in zip(names, counts):
+        snap = snaps[n]
+        old_rows = 0 if _needs_full(snap, refresh) else len(snap["values"])
+        if old_rows and n_rows >= old_rows:
+            plan[n] = ("delta", len(ranges), old_rows)
+            ranges.append(f"{_quote(n)}!{old_rows}:{max(n_rows, old_rows)}")
+        else:
+            plan[n] = ("full", len(ranges), 0)
+            ranges.append(_quote(n))
+    fetched = _batch_values(sh, ranges)
+
+    out: Dict[str, pd.DataFrame] = {}
+    refetch: List[str] = []
+    for n in names:
+        mode, i, old_rows = plan[n]
+        snap = snaps[n]
+        if mode == "delta":
+            rows = fetched[i]
+            if rows and _row_hash(rows[0]) == snap["last_hash"]:
+                if len(rows) == 1:
+                    out[n] = snap["frame"]
+                    continue
+                out[n] = _store_snapshot(gsheet_id, n, snap["values"] + rows[1:], snap.get("synced_at", 0.0),
+                                         snap["frame"].attrs.get(SHEET_LINEAGE_ATTR))
+                continue
+            refetch.append(n)  # última linha salva mudou -> histórico editado
+            continue
+        out[n] = _store_snapshot(gsheet_id, n, fetched[i], lineage=_kept_lineage(snap, fetched[i]))
+
+    if refetch:
+        for n, values in zip(refetch, _batch_values(sh, [_quote(n) for n in refetch])):
+            out[n] = _store_snapshot(gsheet_id, n, values, lineage=_kept_lineage(snaps[n], values))
+    return {n: out[n].copy() for n in names}
+
+@traced
+def load_sheet_tail(client: gspread.Client, gsheet_id: str, sheet_name: str, n_rows: int) -> pd.DataFrame:
+    """Header + só as últimas `n_rows` linhas da aba (sonda a coluna A para saber o tamanho)."""
+    sh = open_spreadsheet(client, gsheet_id)
+    total = len(_batch_values(sh, [f"{_quote(sheet_name)}!A:A"])[0])
+    if total <= 1:
+        return pd.DataFrame()
+    header, rows = _batch_values(sh, [f"{_quote(sheet_name)}!1:1", f"{_quote(sheet_name)}!{max(2, total - n_rows + 1)}:{total}"])
+    return _values_to_df(header[:1] + rows)
+
+def tail_loader(n_rows: int):
+    """Função compatível com load_sheet que lê só as últimas `n_rows` linhas."""
+    def _load(client: gspread.Client, gsheet_id: str, sheet_name: str) -> pd.DataFrame:
+        return load_sheet_tail(client, gsheet_id, sheet_name, n_rows)
+    return _load
+
+def preloaded_loader(frames: Dict[str, pd.DataFrame], fallback=None):
+    """Função compatível com load_sheet que serve abas já carregadas (fallback: load_sheet)."""
+    fallback = fallback or load_sheet
+    def _load(client: gspread.Client, gsheet_id: str, sheet_name: str) -> pd.DataFrame:
+        if sheet_name in frames:
+            return frames[sheet_name]  # somente leitura (quem altera deve copiar)
+        return fallback(client, gsheet_id, sheet_name)
+    return _load
+
 def get_client(sa_info: Optional[Dict[str, Any]], sa_file: Optional[str]) -> gspread.Client:
     return _authorize_gspread(sa_info, sa_file)
@@ -0,0 +1,87 @@
+# http_client.py
+# Transporte HTTP compartilhado: requests.Session com keep-alive/pool de conexões,
+# retry com backoff exponencial + jitter (respeita Retry-After) e limite de concorrência por host.
+from __future__ import annotations
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import email.utils
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 3
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 30.0
+# Requisições simultâneas por host (demais: DEFAULT_HOST_LIMIT)
+HOST_LIMITS = {"api.notion.com": 3, "api.tradingeconomics.com": 2}  # >>> MANUAL INPUT (opcional)
+DEFAULT_HOST_LIMIT = 4
+POOL_SIZE = 10
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_host_sems: Dict[str, threading.BoundedSemaphore] = {}
+
+def get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+        return _session
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc.lower()
+    with _session_lock:
+        if host not in _host_sems:
+            _host_sems[host] = threading.BoundedSemaphore(HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+        return _host_sems[host]
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    """Retry-After em segundos (aceita número ou data HTTP)."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except Exception:
+        return None
+
+def _backoff(attempt: int) -> float:
+    # "full jitter": uniforme em [0, min(max, base * 2^attempt)]
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** attempt)))
+
+def request(method: str, url: str, retries: int = MAX_RETRIES, **kwargs) -> requests.Response:
+    """Como requests.request, via sessão compartilhada, com retry em 429/5xx e erros de conexão."""
+    kwargs.setdefault("timeout", 30)
+    sem = _host_semaphore(url)
+    for attempt in range(retries + 1):
+        try:
+            with sem:
+                resp = get_session().request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+        if resp.status_code not in RETRY_STATUSES or attempt >= retries:
+            return resp
+        wait = _retry_after(resp)
+        time.sleep(min(BACKOFF_MAX_S, wait) if wait is not None else _backoff(attempt))
+    return resp
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+def patch(url: str, **kwargs) -> requests.Response:
+    return request("PATCH", url, **kwargs)
@@ -0,0 +1,317 @@
+# hud_core.py
+# Núcleo do HUD: busca as fontes, calcula métricas e monta o mapping do template.
+# Usado por main.py (CLI/cron) e app.py (Streamlit) — único lugar para cache/concorrência.
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+import datetime as dt
+import time
+import pandas as pd
+from zoneinfo import ZoneInfo
+
+from aggregates import attach_aggregates
+from gsheets_io import load_sheets, preloaded_loader, tail_loader
+from turtle import get_today_turtle_objective
+from metrics import (
+    DailyFrame, RunningFrame, energy_pct_from_row, energy_bar_10,
+    stress_wtd_mean, breathwork_today_and_7d, breathwork_streak_days,
+    sleep_period_avg, running_period_avg_pace, running_last_vo2, build_insights_table_md,
+    minutes_to_mmss, hours_to_hhmm, int_fmt, num_fmt, today_brt
+)
+from market_provider import MarketData, fetch_latest_news, fetch_macro_events, format_macro_agenda, fmt_pct, PERIODS
+from local_store import NullCache, read_frame, write_frame
+from pipeline import Pipeline, Stage
+from renderer import check_template, render_template
+from schema import ACTIVITIES_SCHEMA, DAILY_SCHEMA, apply_schema, apply_schemas
+from tracing import current_spans, span, trace, traced
+from template_md import TEMPLATE
+
+SHEET_TABS = ["DailyHUD", "Activities", "Turtle"]
+# Se "Turtle" sair de SHEET_TABS, lê só as últimas N linhas da aba (devem incluir a linha de hoje)
+TURTLE_TAIL_ROWS = 400  # >>> MANUAL INPUT (opcional)
+# Timeouts (s) por fonte, contados a partir do disparo paralelo
+STAGE_TIMEOUTS = {"sheets": 90, "market": 60, "news": 20, "agenda": 30}  # >>> MANUAL INPUT (opcional)
+# Validade (s) de cada fonte no cache: preços intradiários, notícias em minutos.
+# A agenda tem cache diário próprio (market_provider); aqui só limita a consulta de "Actual" pendentes.
+SOURCE_TTLS = {"sheets": 60, "market": 900, "news": 300, "agenda": 300}  # >>> MANUAL INPUT (opcional)
+
+MARKET_MAIN = ("SPX", "IBOV", "WIN", "WDO")
+MARKET_CORR = ("VIX", "US10Y", "DXY", "USDBRL", "BRENT", "GOLD")
+# níveis dos correlatos no mapping: casas decimais e se leva "%"
+LEVEL_FORMATS = {"VIX": (2, False), "US10Y": (2, True), "DXY": (2, False),
+                 "USDBRL": (4, False), "BRENT": (2, False), "GOLD": (2, False)}
+MESES = ["janeiro","fevereiro","março","abril","maio","junho","julho","agosto","setembro","outubro","novembro","dezembro"]
+EMPTY_NEWS = {"source":"","title":"","date_brt":"","url":""}
+
+@dataclass
+class HudContext:
+    """Resultado completo de um build do HUD (picklável, cacheável)."""
+    generated_at: dt.datetime
+    mapping: Dict[str, str]
+    news: List[Dict[str, str]]
+    br_events: str
+    us_events: str
+    returns: Dict[str, Dict[str, str]]      # chave -> {D1..12M} formatado
+    levels: Dict[str, str]                  # chave -> nível formatado
+    events: List[Dict[str, str]] = field(default_factory=list)  # agenda macro estruturada
+    daily_empty: bool = False
+    errors: Dict[str, str] = field(default_factory=dict)
+    spans: List[Dict[str, Any]] = field(default_factory=list)  # tracing do build (tracing.py)
+
+    def render(self, template: str = TEMPLATE) -> str:
+        return render_template(template, self.mapping)
+
+    def check(self, template: str = TEMPLATE) -> Tuple[List[str], List[str]]:
+        """(placeholders ausentes no mapping, chaves não usadas pelo template)."""
+        return check_template(template, self.mapping)
+
+# ---------- Fontes ----------
+SOURCE_NAMES = ("sheets", "market", "news", "agenda")
+SOURCE_DEFAULTS = {"market": None, "news": [], "agenda": []}
+
+def source_fetchers(cfg, client, as_of: Optional[dt.date] = None,
+                    refresh: bool = False) -> Dict[str, Tuple[Optional[str], Any]]:
+    """
+    fonte -> (chave no cache, função de busca sem cache); chave None = não passa pelo cache.
+    `as_of` (HUD histórico): mercado até a data, agenda daquele dia e sem notícias (RSS só tem o presente;
+    o [] do HUD histórico não pode sobrescrever as notícias do HUD ao vivo no cache).
+    `refresh`: Sheets ignora os snapshots locais e baixa as abas inteiras.
+    """
+    day = (as_of or today_brt()).isoformat()
+    market_key = f"market_{cfg.win_ticker}_{cfg.wdo_ticker}" + (f"_{day}" if as_of else "")
+    return {
+        "sheets": (f"sheets_{cfg.gsheet_id}", lambda: apply_schemas(load_sheets(client, cfg.gsheet_id, SHEET_TABS, refresh=refresh))),
+        "market": (market_key,
+                   lambda: MarketData(win_ticker=cfg.win_ticker, wdo_ticker=cfg.wdo_ticker, as_of=as_of)),
+        "news": (None, lambda: []) if as_of else ("news", lambda: fetch_latest_news(max_items=6)),
+        "agenda": (f"agenda_events_{day}", lambda: fetch_macro_events(cfg.te_api_key, day=as_of)),
+    }
+
+def start_sources(cfg, client, cache=None, refresh: bool = False,
+                  as_of: Optional[dt.date] = None) -> Pipeline:
+    """
+    Dispara Sheets/Yahoo/RSS/TE em paralelo (cada um via cache, com SOURCE_TTLS) e devolve o
+    Pipeline em andamento: quem chama coleta cada fonte com pipe.result(nome) quando precisar.
+    refresh=True ignora o cache e rebusca tudo.
+    """
+    cache = cache or NullCache()
+    fetchers = source_fetchers(cfg, client, as_of, refresh)
+
+    def _cached(source: str):
+        key, fn = fetchers[source]
+        def _run():
+            with span(f"source.{source}"):
+                if key is None:
+                    return fn()
+                return cache.get_or_set(key, SOURCE_TTLS[source], fn, refresh=refresh)
+        return _run
+
+    return Pipeline([
+        Stage(name, _cached(name), timeout=STAGE_TIMEOUTS[name],
+              default=SOURCE_DEFAULTS.get(name), required=(name == "sheets"))
+        for name in SOURCE_NAMES
+    ]).start()
+
+def fetch_sources(cfg, client, cache=None, refresh: bool = False,
+                  as_of: Optional[dt.date] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Todas as fontes (em paralelo, via start_sources). Retorna (resultados, erros)."""
+    pipe = start_sources(cfg, client, cache, refresh, as_of)
+    try:
+        results = {name: pipe.result(name) for name in SOURCE_NAMES}
+    finally:
+        pipe.shutdown()
+    return results, dict(pipe.errors)
+
+@traced
+def prepare_frames(sheets: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """DailyHUD/Activities nos dtypes compactos de schema.py (sem copiar se já vierem tipados)."""
+    daily = apply_schema(sheets.get("DailyHUD", pd.DataFrame()), DAILY_SCHEMA)
+    acts = apply_schema(sheets.get("Activities", pd.DataFrame()), ACTIVITIES_SCHEMA)
+    return daily, acts
+
+# ---------- Blocos do mapping ----------
+def date_fields(now: dt.datetime) -> Dict[str, str]:
+    return {
+        "DATA_EXTENSO": f"{now.day} de {MESES[now.month-1]} de {now.year}",
+        "DIA_SEMANA_PT": now.strftime("%A").capitalize(),
+        "HORA_LOCAL_BRT": now.strftime("%H:%M") + " BRT",
+    }
+
+@traced
+def health_fields(dd: DailyFrame) -> Dict[str, str]:
+    if dd.empty:
+        return {
+            "ENERGY_BAR_10": energy_bar_10(None), "ENERGY_PCT": "-",
+            "SONO_HORAS": "-", "SONO_SCORE": "-", "KCAL_DIA_ONTEM": "-", "PASSOS_ONTEM": "-",
+            "STRESS_SCORE": "-", "MEDIT_MIN": "0", "MEDIT_STREAK": "0",
+            "SONO_7D_H": "-", "SONO_MTD_H": "-", "SONO_QTD_H": "-", "SONO_YTD_H": "-",
+            "INSIGHTS_TABLE_MD": "_Sem dados_",
+        }
+    last_row = dd.last_row()
+    energy = energy_pct_from_row(last_row)
+    d_ontem = dd.rows_on(dd.today - dt.timedelta(days=1))
+    row_y = d_ontem.iloc[-1] if not d_ontem.empty else last_row
+    _, bw_7d = breathwork_today_and_7d(dd)
+    return {
+        "ENERGY_BAR_10": energy_bar_10(energy),
+        "ENERGY_PCT": (str(energy) if energy is not None else "-"),
+        "SONO_HORAS": num_fmt(last_row.get("Sono (h)"), 1),
+        "SONO_SCORE": num_fmt(last_row.get("Sono (score)"), 0),
+        "KCAL_DIA_ONTEM": int_fmt(row_y.get("Calorias (total dia)")),
+        "PASSOS_ONTEM": int_fmt(row_y.get("Passos")),
+        "STRESS_SCORE": num_fmt(stress_wtd_mean(dd), 2),
+        "MEDIT_MIN": str(bw_7d),  # média 7d
+        "MEDIT_STREAK": str(breathwork_streak_days(dd)),
+        "SONO_7D_H": hours_to_hhmm(sleep_period_avg(dd, "Sono (h)", "7D")),
+        "SONO_MTD_H": hours_to_hhmm(sleep_period_avg(dd, "Sono (h)", "MTD")),
+        "SONO_QTD_H": hours_to_hhmm(sleep_period_avg(dd, "Sono (h)", "QTD")),
+        "SONO_YTD_H": hours_to_hhmm(sleep_period_avg(dd, "Sono (h)", "YTD")),
+        "INSIGHTS_TABLE_MD": build_insights_table_md(dd),
+    }
+
+@traced
+def running_fields(rf: RunningFrame) -> Dict[str, str]:
+    last_run = rf.last_session()
+    out = {
+        "RUN_DATA": last_run["date"], "RUN_DIST": last_run["km"],
+        "RUN_PACE": last_run["pace"], "RUN_FC_MEDIA": last_run["fc"],
+        "VO2MAX": num_fmt(running_last_vo2(rf), 0) if not rf.empty else "-",
+    }
+    for period in ("7D", "SEM", "MES", "TRIM", "ANO"):
+        out[f"PACE_{period}"] = minutes_to_mmss(running_period_avg_pace(rf, period)) if not rf.empty else "-"
+    return out
+
+@traced
+def market_fields(md: Optional[MarketData], cfg) -> Tuple[Dict[str, Dict[str, str]], Dict[str, str]]:
+    """Retornos formatados (todos os ativos numa passada) e níveis dos correlatos."""
+    rets_table = md.returns_table() if md is not None else pd.DataFrame()
+    enabled = {"WIN": bool(cfg.win_ticker), "WDO": bool(cfg.wdo_ticker)}
+
+    def _fmt_rets(key: str) -> Dict[str, str]:
+        if not enabled.get(key, True) or key not in rets_table.index:
+            return {k: "-" for k in PERIODS}
+        return {k: (fmt_pct(v) if pd.notna(v) else "-") for k, v in rets_table.loc[key].items()}
+
+    returns = {k: _fmt_rets(k) for k in MARKET_MAIN + MARKET_CORR}
+    levels = {k: fmt_level(k, md.last_level(k) if md is not None else None) for k in LEVEL_FORMATS}
+    return returns, levels
+
+def fmt_level(key: str, v: Optional[float]) -> str:
+    if v is None:
+        return "-"
+    nd, as_pct = LEVEL_FORMATS[key]
+    return f"{v:.{nd}f}%" if as_pct else f"{v:.{nd}f}"
+
+def manual_fields(cfg) -> Dict[str, str]:
+    return {
+        "CGA_STATUS": cfg.cga_status, "ESTUDO_MIN_HOJE": cfg.estudo_min_hoje,
+        "LIVRO_TITULO": cfg.livro_titulo, "LIVRO_PAG_ATUAL": cfg.livro_pag_atual,
+        "LIVRO_PAG_TOTAL": cfg.livro_pag_total, "LIVRO_PROGRESSO": cfg.livro_progresso,
+        "LOSS_MAX_R": cfg.loss_max_r, "PAUSE_TRIGGER_REGRA": cfg.pause_trigger_regra,
+        "LAZER_STREAK": cfg.lazer_streak,
+        "LINK_GARMIN": cfg.link_garmin, "LINK_NOTION": cfg.link_notion,
+        "LINK_FUNDSCREENER": cfg.link_fundscreener, "LINK_SWM": cfg.link_swm,
+    }
+
+# ---------- Build ----------
+def build_hud_context(cfg, client, cache=None, now: Optional[dt.datetime] = None,
+                      refresh: bool = False, as_of: Optional[dt.date] = None) -> HudContext:
+    """
+    Busca as fontes (em paralelo, via `cache`), calcula as métricas e monta o mapping.
+    `as_of`: gera o HUD como seria naquele dia (só dados até a data).
+    """
+    with trace("hud_build"):
+        now, today = _build_clock(now, as_of)
+        pipe = start_sources(cfg, client, cache, refresh=refresh, as_of=as_of)
+        try:
+            sheets = pipe.result("sheets")
+            # métricas do Sheets enquanto Yahoo/RSS/TE ainda chegam
+            fields, daily_empty = sheet_fields(cfg, client, sheets, today, as_of)
+            sources = {"sheets": sheets, **{name: pipe.result(name) for name in SOURCE_NAMES if name != "sheets"}}
+        finally:
+            pipe.shutdown()
+        return _assemble_context(cfg, sources, dict(pipe.errors), now, fields, daily_empty)
+
+def _build_clock(now: Optional[dt.datetime], as_of: Optional[dt.date]) -> Tuple[dt.datetime, dt.date]:
+    """(instante do HUD, dia de referência): as_of vira o fim daquele dia."""
+    tz = ZoneInfo("America/Sao_Paulo")
+    if now is None:
+        now = dt.datetime.combine(as_of, dt.time(23, 59), tz) if as_of else dt.datetime.now(tz)
+    return now, as_of or now.date()
+
+def sheet_fields(cfg, client, sheets: Dict[str, pd.DataFrame], today: dt.date,
+                 as_of: Optional[dt.date] = None) -> Tuple[Dict[str, str], bool]:
+    """Campos que só dependem do Sheets (saúde, objetivo do Turtle, corrida) e se o DailyHUD está vazio."""
+    daily, acts = prepare_frames(sheets)
+    dd = DailyFrame(daily, today)  # datas/ordenação/períodos calculados uma vez
+    if as_of is None:
+        attach_aggregates(cfg.gsheet_id, dd)  # WTD/MTD/.../7D incrementais (só o HUD do dia)
+    rf = RunningFrame(acts, today)  # filtra/parseia/agrega corridas uma vez
+
+    fields: Dict[str, str] = {}
+    fields.update(health_fields(dd))
+    with span("turtle.objective"):
+        fields["TURTLE_OBJETIVO_TEXTO"] = get_today_turtle_objective(
+            preloaded_loader(sheets, fallback=tail_loader(TURTLE_TAIL_ROWS)), client, cfg.gsheet_id, today)
+    fields.update(running_fields(rf))
+    return fields, dd.empty
+
+def context_from_sources(cfg, client, sources: Dict[str, Any], errors: Optional[Dict[str, str]] = None,
+                         now: Optional[dt.datetime] = None, as_of: Optional[dt.date] = None) -> HudContext:
+    """Métricas + mapping a partir de fontes já carregadas (sem I/O de rede)."""
+    now, today = _build_clock(now, as_of)
+    fields, daily_empty = sheet_fields(cfg, client, sources["sheets"], today, as_of)
+    return _assemble_context(cfg, sources, errors, now, fields, daily_empty)
+
+def _assemble_context(cfg, sources: Dict[str, Any], errors: Optional[Dict[str, str]], now: dt.datetime,
+                      fields: Dict[str, str], daily_empty: bool) -> HudContext:
+    """Junta os campos do Sheets com mercado/agenda/notícias no mapping final."""
+    errors = dict(errors or {})
+    returns, levels = market_fields(sources["market"], cfg)
+    news = sources["news"] or []
+    events = sources["agenda"] or []
+    br_events, us_events = format_macro_agenda(events)
+
+    mapping: Dict[str, str] = {}
+    mapping.update(date_fields(now))
+    mapping.update(manual_fields(cfg))
+    mapping.update(fields)
+    # Mercado – retornos
+    for key in MARKET_MAIN:
+        for p in PERIODS:
+            mapping[f"{key}_{p}"] = returns[key][p]
+    # Correlatos – níveis e retornos
+    for key in MARKET_CORR:
+        mapping[f"{key}_NIVEL"] = levels[key]
+        for p in ("D1", "WTD", "MTD"):
+            mapping[f"{key}_{p}"] = returns[key][p]
+    # Agenda Macro
+    mapping["BR_EVENTOS_HOJE_LIST"] = br_events or ""
+    mapping["US_EVENTOS_HOJE_LIST"] = us_events or ""
+    mapping["ALERTAS_MERCADO_TXT"] = ""  # >>> MANUAL INPUT: defina suas regras e textos aqui, se quiser
+    # Notícias → NEWS1..6
+    for i in range(6):
+        src = news[i] if i < len(news) else EMPTY_NEWS
+        mapping[f"NEWS{i+1}_SOURCE"] = src.get("source","")
+        mapping[f"NEWS{i+1}_TITULO"] = src.get("title","")
+        mapping[f"NEWS{i+1}_DATAISO_BRT"] = src.get("date_brt","")
+        mapping[f"NEWS{i+1}_URL"] = src.get("url","")
+
+    return HudContext(
+        generated_at=now, mapping=mapping, news=news,
+        br_events=br_events or "", us_events=us_events or "", events=events,
+        returns=returns, levels=levels, daily_empty=daily_empty, errors=errors, spans=current_spans(),
+    )
+
+# ---------- HUD pré-calculado (escrito pelo refresher, lido pelo app) ----------
+LATEST_NS = "hud"
+
+def save_latest(ctx: HudContext, hud_md: str) -> None:
+    write_frame(LATEST_NS, "latest", {"t": time.time(), "ctx": ctx, "md": hud_md})
+
+def load_latest(max_age: float) -> Optional[Tuple[HudContext, str]]:
+    """Último HUD salvo pelo refresher, se mais novo que `max_age` segundos."""
+    hit = read_frame(LATEST_NS, "latest")
+    if not isinstance(hit, dict) or time.time() - hit.get("t", 0) > max_age:
+        return None
+    return hit["ctx"], hit["md"]
@@ -0,0 +1,206 @@
+# intraday.py
+# Modo intradiário do mercado: polling de barras de 1 minuto dos tickers configurados sobre um
+# MarketData diário já carregado. Cada ticker guarda as barras do pregão num ring buffer em memória;
+# a cada poll só entram as barras novas e só os tickers que mudaram têm nível/retornos refeitos.
+# As âncoras (fechamento anterior e início de WTD/MTD/QTD/YTD/12M) saem do histórico diário uma
+# vez por pregão — o histórico não é recarregado.
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional, Tuple
+import datetime as dt
+import threading
+import numpy as np
+import pandas as pd
+
+from market_provider import (
+    BRT, PERIODS, MarketData, _close_frame, _day_index, _row_to_dict, adjust_level, period_starts, today_brt,
+)
+from tracing import traced
+
+INTRADAY_INTERVAL = "1m"       # >>> MANUAL INPUT (opcional): granularidade das barras (Yahoo)
+INTRADAY_BUFFER_BARS = 720     # barras por ticker no buffer (12h de pregão em 1m)
+
+# Fonte de barras: (tickers, since) -> df (linhas=timestamps, colunas=ticker com Close), só barras >= since
+QuoteSource = Callable[[List[str], Optional[pd.Timestamp]], pd.DataFrame]
+
+@traced
+def yf_minute_bars(tickers: List[str], since: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """Barras intradiárias (Close) do pregão corrente no Yahoo; com `since`, só pede as a partir dele."""
+    import yfinance as yf  # import tardio: pesado e só necessário quando há download
+    window = {"period": "1d"} if since is None else {"start": since.to_pydatetime()}
+    df = yf.download(
+        tickers=tickers, interval=INTRADAY_INTERVAL, **window,
+        group_by="ticker", auto_adjust=False, progress=False, threads=True,
+    )
+    out = _close_frame(df, tickers)
+    if since is not None and not out.empty:
+        out = out[_to_brt(out.index) >= since]  # o Yahoo pode arredondar o início para baixo
+    return out
+
+class ReplayQuotes:
+    """
+    Fonte local (testes/benchmark, sem rede): reproduz `bars` como se o pregão andasse `step`
+    barras a cada chamada. Mesmo contrato de yf_minute_bars.
+    """
+    def __init__(self, bars: pd.DataFrame, step: int = 1, start: int = 0):
+        self.bars = bars.sort_index()
+        self.step = step
+        self.pos = start
+
+    def __call__(self, tickers: List[str], since: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        self.pos = min(len(self.bars), self.pos + self.step)
+        out = self.bars.iloc[:self.pos]
+        if since is not None:
+            out = out[_to_brt(out.index) >= since]
+        return out[[t for t in tickers if t in out.columns]]
+
+def _to_brt(idx: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """Timestamps em BRT (índices sem fuso são tratados como BRT)."""
+    return idx.tz_convert(BRT) if idx.tz is not None else idx.tz_localize(BRT)
+
+class RingBuffer:
+    """Últimas `capacity` barras (timestamp em ns, close) de um ticker em arrays circulares."""
+    def __init__(self, capacity: int = INTRADAY_BUFFER_BARS):
+        self.ts = np.zeros(capacity, dtype="int64")
+        self.close = np.full(capacity, np.nan)
+        self.size = 0
+        self._next = 0  # posição da próxima escrita
+
+    @property
+    def _last(self) -> int:
+        return (self._next - 1) % len(self.ts)
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        return int(self.ts[self._last]) if self.size else None
+
+    def last(self) -> Optional[float]:
+        return float(self.close[self._last]) if self.size else None
+
+    def append(self, ts: int, close: float) -> bool:
+        """Anexa a barra se for nova; a mesma barra (ainda em formação) só atualiza o close."""
+        if self.size and ts <= self.ts[self._last]:
+            if ts == self.ts[self._last] and close != self.close[self._last]:
+                self.close[self._last] = close
+                return True
+            return False
+        self.ts[self._next], self.close[self._next] = ts, close
+        self._next = (self._next + 1) % len(self.ts)
+        self.size = min(self.size + 1, len(self.ts))
+        return True
+
+    def to_series(self) -> pd.Series:
+        """Barras do buffer em ordem cronológica (índice em BRT)."""
+        order = (np.arange(self.size) + self._next - self.size) % len(self.ts)
+        idx = pd.to_datetime(self.ts[order], utc=True).tz_convert(BRT)
+        return pd.Series(self.close[order], index=idx)
+
+def session_anchors(prices: pd.DataFrame, symbols: List[str], session: dt.date) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Âncoras do pregão `session` a partir das barras diárias anteriores a ele:
+    (fechamento anterior por ticker, matriz períodos-sem-D1 x tickers com o 1º valor em/após o início).
+    NaN na matriz = o período começa no próprio pregão (retorno parte do nível atual, como no diário).
+    """
+    hist = prices.reindex(columns=symbols) if prices is not None else pd.DataFrame(columns=symbols)
+    if not hist.empty:
+        hist = hist.sort_index()
+        hist = hist.loc[_day_index(hist) < pd.Timestamp(session)]
+    n_periods = len(PERIODS) - 1
+    if hist.empty:
+        return np.full(len(symbols), np.nan), np.full((n_periods, len(symbols)), np.nan)
+    prev = hist.ffill().to_numpy(dtype=float)[-1]
+    filled = hist.bfill().to_numpy(dtype=float)
+    pos = _day_index(hist).searchsorted(pd.DatetimeIndex(list(period_starts(session).values())), side="left")
+    anchors = np.array([filled[i] if i < len(filled) else np.full(len(symbols), np.nan) for i in pos])
+    return prev, anchors
+
+class IntradayMarket:
+    """
+    MarketData "ao vivo": mesma interface usada pelo HUD (tickers, last_level, returns_table,
+    returns). Tickers sem barra no pregão (fechados, sem cotação) seguem com os números diários.
+    """
+    def __init__(self, daily: MarketData, source: Optional[QuoteSource] = None,
+                 capacity: int = INTRADAY_BUFFER_BARS, session: Optional[dt.date] = None):
+        if daily.as_of is not None:
+            raise ValueError("Modo intradiário só vale para o HUD do dia (sem as_of).")
+        self.daily = daily
+        self.tickers = daily.tickers
+        self.as_of = None
+        self.source = source or yf_minute_bars
+        self.session = session or today_brt()
+        self.symbols = list(dict.fromkeys(self.tickers.values()))
+        self._col = {t: i for i, t in enumerate(self.symbols)}
+        self.buffers = {t: RingBuffer(capacity) for t in self.symbols}
+        self._live = np.full(len(self.symbols), np.nan)
+        self._prev, self._anchors = session_anchors(daily._prices, self.symbols, self.session)
+        self._returns: Optional[pd.DataFrame] = None
+        self._lock = threading.Lock()
+        self.last_poll: Optional[dt.datetime] = None
+
+    def stale(self) -> bool:
+        """Virou o dia: as âncoras são de outro pregão (recarregar o MarketData diário)."""
+        return today_brt() != self.session
+
+    @traced
+    def poll(self) -> int:
+        """Busca só as barras novas na fonte e as anexa aos buffers; retorna quantas barras mudaram."""
+        known = [b.last_ts for b in self.buffers.values() if b.size]
+        # antes da 1ª barra: a partir da 0h do pregão (period="1d" traria o pregão anterior antes da abertura)
+        since = pd.Timestamp(min(known), tz="UTC").tz_convert(BRT) if known else pd.Timestamp(self.session, tz=BRT)
+        bars = self.source(self.symbols, since)
+        changed = 0
+        if not bars.empty:
+            idx = _to_brt(pd.DatetimeIndex(bars.index))
+            keep = idx.date == self.session  # descarta barras de pregões anteriores (antes da abertura)
+            stamps = idx[keep].as_unit("ns").asi8
+            vals = bars.to_numpy(dtype=float)[keep]
+        with self._lock:
+            for j, t in enumerate(bars.columns if not bars.empty else []):
+                buf = self.buffers.get(t)
+                if buf is None:
+                    continue
+                col = vals[:, j]
+                ok = ~np.isnan(col)
+                n = sum(buf.append(int(ts), float(v)) for ts, v in zip(stamps[ok], col[ok]))
+                if n:
+                    self._live[self._col[t]] = buf.last()
+                    changed += n
+            if changed:
+                self._returns = None
+            self.last_poll = dt.datetime.now(BRT)
+        return changed
+
+    def bars(self, key: str) -> pd.Series:
+        """Barras do pregão de um ativo (ex.: 'WIN')."""
+        t = self.tickers.get(key)
+        with self._lock:
+            return self.buffers[t].to_series() if t in self.buffers else pd.Series(dtype=float)
+
+    def last_level(self, key: str) -> Optional[float]:
+        t = self.tickers.get(key)
+        with self._lock:
+            v = self._live[self._col[t]] if t in self._col else np.nan
+        return adjust_level(key, float(v)) if not np.isnan(v) else self.daily.last_level(key)
+
+    def returns_table(self) -> pd.DataFrame:
+        """Tabela diária com as linhas dos tickers com barra no pregão refeitas sobre o último preço."""
+        with self._lock:
+            if self._returns is None:
+                daily = self.daily.returns_table()
+                live = self._live
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    d1 = np.where(self._prev != 0, live / self._prev - 1.0, np.nan)
+                    base = np.where(np.isnan(self._anchors), live, self._anchors)
+                    rest = np.where(base != 0, live / base - 1.0, np.nan)
+                vals = daily.to_numpy(dtype=float, copy=True)
+                for i, key in enumerate(daily.index):
+                    j = self._col[self.tickers[key]]
+                    if not np.isnan(live[j]):
+                        vals[i, 0], vals[i, 1:] = d1[j], rest[:, j]
+                self._returns = pd.DataFrame(vals, index=daily.index, columns=daily.columns)
+            return self._returns
+
+    def returns(self, key: str) -> Dict[str, Optional[float]]:
+        table = self.returns_table()
+        if key not in table.index:
+            return {p: None for p in PERIODS}
+        return _row_to_dict(table.loc[key])
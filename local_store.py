@@ -0,0 +1,151 @@
+# local_store.py
+# Armazenamento local (disco) para caches do HUD: DataFrames/Series em pickle e metadados em JSON.
+from __future__ import annotations
+from typing import Any, Optional, Tuple
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+# >>> MANUAL INPUT (opcional): diretório do cache via env HUD_CACHE_DIR
+CACHE_DIR = os.getenv("HUD_CACHE_DIR", ".hud_cache")
+
+def _safe_name(name: str) -> str:
+    """Converte chave arbitrária (ex.: '^GSPC', 'DX-Y.NYB') em nome de arquivo seguro."""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+def cache_path(namespace: str, name: str, ext: str) -> str:
+    folder = os.path.join(CACHE_DIR, namespace)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{_safe_name(name)}.{ext}")
+
+def _atomic_write(path: str, writer) -> None:
+    """Grava num temporário exclusivo (escritores concorrentes não se misturam) e troca de uma vez."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        writer(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def read_frame(namespace: str, name: str) -> Optional[Any]:
+    """Lê DataFrame/Series salvo; None se ausente ou corrompido."""
+    path = cache_path(namespace, name, "pkl")
+    if not os.path.exists(path):
+        return None
+    try:
+        import pandas as pd  # só quem usa frames paga o import do pandas
+        return pd.read_pickle(path)
+    except Exception:
+        return None
+
+def write_frame(namespace: str, name: str, obj) -> None:
+    path = cache_path(namespace, name, "pkl")
+    try:
+        import pandas as pd
+        _atomic_write(path, lambda p: pd.to_pickle(obj, p))
+    except Exception:
+        pass
+
+def read_json(namespace: str, name: str, default=None):
+    path = cache_path(namespace, name, "json")
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+def write_json(namespace: str, name: str, data) -> None:
+    path = cache_path(namespace, name, "json")
+    def _w(p):
+        with open(p, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+    try:
+        _atomic_write(path, _w)
+    except Exception:
+        pass
+
+# ------------------------
+# Backends de cache (memoização de fontes/contexto do HUD)
+# ------------------------
+class NullCache:
+    """Sem cache: sempre recalcula."""
+    def get_entry(self, key: str, ttl: float) -> Optional[Tuple[float, Any]]:
+        """(instante da gravação, valor), se dentro do ttl."""
+        return None
+
+    def get(self, key: str, ttl: float):
+        hit = self.get_entry(key, ttl)
+        return hit[1] if hit is not None else None
+
+    def set(self, key: str, value, ts: Optional[float] = None) -> None:
+        """Grava `value`; `ts` preserva o instante original (cópia entre camadas) em vez de agora."""
+        pass
+
+    def get_or_set(self, key: str, ttl: float, fn, refresh: bool = False):
+        """Valor em cache (se dentro do ttl) ou fn(); refresh=True ignora o cache e regrava."""
+        hit = None if refresh else self.get(key, ttl)
+        if hit is not None:
+            return hit
+        value = fn()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+class MemoryCache(NullCache):
+    """Cache em memória do processo (ex.: compartilhado entre reruns do Streamlit)."""
+    def __init__(self):
+        self._data: dict = {}
+        self._lock = threading.Lock()
+
+    def get_entry(self, key: str, ttl: float):
+        with self._lock:
+            hit = self._data.get(key)
+        if hit and time.time() - hit[0] <= ttl:
+            return hit
+        return None
+
+    def set(self, key: str, value, ts: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (time.time() if ts is None else ts, value)
+
+class DiskCache(NullCache):
+    """Cache em disco (pickle em CACHE_DIR/<namespace>) — compartilhado entre main.py e app.py."""
+    def __init__(self, namespace: str = "context"):
+        self.namespace = namespace
+
+    def get_entry(self, key: str, ttl: float):
+        hit = read_frame(self.namespace, key)
+        if isinstance(hit, dict) and time.time() - hit.get("t", 0) <= ttl:
+            return hit.get("t", 0), hit.get("v")
+        return None
+
+    def set(self, key: str, value, ts: Optional[float] = None) -> None:
+        write_frame(self.namespace, key, {"t": time.time() if ts is None else ts, "v": value})
+
+class TieredCache(NullCache):
+    """Encadeia backends (ex.: memória -> disco); um acerto numa camada lenta reabastece as rápidas."""
+    def __init__(self, *layers: NullCache):
+        self.layers = layers
+
+    def get_entry(self, key: str, ttl: float):
+        for i, layer in enumerate(self.layers):
+            hit = layer.get_entry(key, ttl)
+            if hit is not None and hit[1] is not None:
+                for faster in self.layers[:i]:
+                    faster.set(key, hit[1], ts=hit[0])  # mantém a idade: não estende o ttl
+                return hit
+        return None
+
+    def set(self, key: str, value, ts: Optional[float] = None) -> None:
+        for layer in self.layers:
+            layer.set(key, value, ts)
@@ -3,11 +3,12 @@
 from __future__ import annotations
 from typing import Dict, List, Tuple, Optional
 import datetime as dt
+import time
+import numpy as np
 import pandas as pd
-import yfinance as yf
-import feedparser
-from dateutil import parser as dtparser
 from zoneinfo import ZoneInfo
+from local_store import read_frame, write_frame, read_json, write_json
+from tracing import span, traced
 
 # ------------------------
 # Helpers de data/tempo
@@ -49,79 +50,182 @@ def fmt_num(x: Optional[float], nd=2) -> str:
 # ------------------------
 # Yahoo Finance
 # ------------------------
-def _download_prices(tickers: List[str], lookback_days: int = 550) -> pd.DataFrame:
-    """Baixa dados diários (Close) dos tickers; retorna df com MultiIndex columns (ticker -> field)."""
-    start = today_brt() - dt.timedelta(days=lookback_days)
+@traced
+def _yf_close(tickers: List[str], start: dt.date) -> pd.DataFrame:
+    """Baixa dados diários (Close) dos tickers a partir de `start`; colunas simples por ticker."""
+    import yfinance as yf  # import tardio: pesado e só necessário quando há download
     df = yf.download(
         tickers=tickers, start=start.isoformat(),
         interval="1d", group_by="ticker", auto_adjust=False, progress=False, threads=True
     )
-    # normaliza para DataFrame com linhas=dates e colunas simples por ticker (Close)
+    return _close_frame(df, tickers)
+
+def _close_frame(df: pd.DataFrame, tickers: List[str]) -> pd.DataFrame:
+    """Normaliza o retorno do yf.download para linhas=barras e colunas simples por ticker (Close)."""
     if isinstance(df.columns, pd.MultiIndex):
-        close_cols = []
         out = pd.DataFrame(index=df.index)
         for t in tickers:
             if (t, "Close") in df.columns:
                 out[t] = pd.to_numeric(df[(t, "Close")], errors="coerce")
-                close_cols.append(t)
         return out
     else:
         # quando só um ticker
+        if "Close" not in df.columns:
+            return pd.DataFrame()
         s = pd.to_numeric(df["Close"], errors="coerce")
         return pd.DataFrame({tickers[0]: s})
-        
-def _first_value_on_or_after(series: pd.Series, d: dt.date) -> Optional[float]:
+
+PRICE_CACHE_NS = "prices"
+
+def _merge_series(old: Optional[pd.Series], new: Optional[pd.Series]) -> Optional[pd.Series]:
+    """Junta histórico local com barras novas; barras novas prevalecem nas datas repetidas."""
+    if new is None or new.dropna().empty:
+        return old
+    new = new.dropna()
+    if old is None or old.empty:
+        return new
+    out = pd.concat([old[old.index < new.index.min()], new])
+    return out[~out.index.duplicated(keep="last")].sort_index()
+
+@traced
+def _download_prices(tickers: List[str], lookback_days: int = 550, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Retorna df (linhas=datas, colunas=ticker com Close).
+    Com cache: lê o histórico local por ticker e pede ao Yahoo apenas as barras a partir da última
+    data salva (inclusive — a última barra pode ter sido gravada ainda parcial no pregão).
+    Cada ticker guarda também (JSON) a data inicial já pedida ao Yahoo: um ticker de histórico curto
+    (ex.: contrato WIN/WDO recente) não volta a baixar tudo só porque a 1ª barra é posterior a `start`.
+    """
+    start = today_brt() - dt.timedelta(days=lookback_days)
+    if not use_cache:
+        return _yf_close(tickers, start)
+
+    cached: Dict[str, pd.Series] = {}
+    covered: Dict[str, dt.date] = {}
+    for t in tickers:
+        s = read_frame(PRICE_CACHE_NS, t)
+        if isinstance(s, pd.Series) and not s.dropna().empty:
+            cached[t] = s.dropna()
+            meta = read_json(PRICE_CACHE_NS, t, {}) or {}
+            first = cached[t].index.min().date()
+            covered[t] = min(first, dt.date.fromisoformat(meta["requested_from"])) if meta.get("requested_from") else first
+
+    # Sem histórico local (ou pedido ao Yahoo a partir de data posterior a `start`) -> download completo
+    full = [t for t in tickers if t not in cached or covered[t] > start + dt.timedelta(days=7)]
+    delta = [t for t in tickers if t not in full]
+
+    fresh: Dict[str, pd.Series] = {}
     try:
-        s = series.dropna()
-        s = s[s.index.date >= d]
-        if s.empty:
-            return None
-        return float(s.iloc[0])
+        if full:
+            df = _yf_close(full, start)
+            fresh.update({t: df[t] for t in df.columns})
+        if delta:
+            since = min(cached[t].index.max().date() for t in delta)
+            df = _yf_close(delta, since)
+            fresh.update({t: df[t] for t in df.columns})
     except Exception:
-        return None
+        pass  # sem rede: segue com o que houver em disco
 
-def _last_two(series: pd.Series) -> Tuple[Optional[float], Optional[float]]:
-    s = series.dropna()
-    if len(s) < 2:
-        if len(s) == 1:
-            return float(s.iloc[-1]), None
-        return None, None
-    return float(s.iloc[-1]), float(s.iloc[-2])
-
-def _return_from_start_to_last(series: pd.Series, start_date: dt.date) -> Optional[float]:
-    v0 = _first_value_on_or_after(series, start_date)
-    v1 = series.dropna().iloc[-1] if not series.dropna().empty else None
-    if v0 is None or v1 is None or v0 == 0:
-        return None
-    return float(v1 / v0 - 1.0)
-
-def _d1_return(series: pd.Series) -> Optional[float]:
-    last_, prev_ = _last_two(series)
-    if last_ is None or prev_ is None or prev_ == 0:
-        return None
-    return float(last_ / prev_ - 1.0)
+    out = pd.DataFrame()
+    for t in tickers:
+        merged = _merge_series(cached.get(t), fresh.get(t))
+        if merged is None:
+            continue
+        if t in fresh:
+            write_frame(PRICE_CACHE_NS, t, merged)
+            if t in full:
+                write_json(PRICE_CACHE_NS, t, {"requested_from": start.isoformat()})
+        out = out.join(merged.rename(t), how="outer") if not out.empty else merged.rename(t).to_frame()
+    if out.empty:
+        return out
+    return out[out.index.date >= start]
 
 # ------------------------
 # Retornos por período
 # ------------------------
+PERIODS = ("D1", "WTD", "MTD", "QTD", "YTD", "12M")
+
+def period_starts(t: dt.date) -> Dict[str, dt.date]:
+    """Data inicial de cada período (exceto D1) relativo a `t`."""
+    return {
+        "WTD": start_of_week(t),
+        "MTD": start_of_month(t),
+        "QTD": start_of_quarter(t),
+        "YTD": start_of_year(t),
+        "12M": t - dt.timedelta(days=365),
+    }
+
+def _day_index(prices: pd.DataFrame) -> pd.DatetimeIndex:
+    return prices.index.normalize().tz_localize(None) if prices.index.tz is not None else prices.index.normalize()
+
+def prices_as_of(prices: pd.DataFrame, as_of: Optional[dt.date]) -> pd.DataFrame:
+    """Só as barras até `as_of` (inclusive); None = sem corte."""
+    if as_of is None or prices is None or prices.empty:
+        return prices
+    return prices.loc[_day_index(prices) <= pd.Timestamp(as_of)]
+
+@traced
+def compute_returns_table(prices: pd.DataFrame, as_of: Optional[dt.date] = None) -> pd.DataFrame:
+    """
+    Retornos D1/WTD/MTD/QTD/YTD/12M de todas as colunas de `prices` numa passada vetorizada.
+    Retorna df (linhas=colunas de `prices`, colunas=PERIODS) com frações; NaN quando indisponível.
+    `as_of` (padrão: hoje) fixa a data de referência e ignora barras posteriores.
+    """
+    prices = prices_as_of(prices, as_of)
+    if prices is None or prices.empty:
+        return pd.DataFrame(columns=list(PERIODS), dtype=float)
+    prices = prices.sort_index()
+    vals = prices.to_numpy(dtype=float)
+    valid = ~np.isnan(vals)
+    cols = np.arange(vals.shape[1])
+
+    # Posições do último e penúltimo valor válido por coluna (contagem reversa de válidos)
+    rev_count = valid[::-1].cumsum(axis=0)[::-1]
+    def _nth_from_end(n: int) -> np.ndarray:
+        sel = valid & (rev_count == n)
+        out = np.full(vals.shape[1], np.nan)
+        has = sel.any(axis=0)
+        out[has] = vals[sel.argmax(axis=0)[has], cols[has]]
+        return out
+    last, prev = _nth_from_end(1), _nth_from_end(2)
+
+    # Primeiro valor válido em/após cada data inicial: bfill + searchsorted no índice de datas
+    filled = prices.bfill().to_numpy(dtype=float)
+    day_index = _day_index(prices)
+    starts = period_starts(as_of or today_brt())
+    pos = day_index.searchsorted(pd.DatetimeIndex(list(starts.values())), side="left")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = {"D1": np.where(prev != 0, last / prev - 1.0, np.nan)}
+        for p, i in zip(starts, pos):
+            v0 = filled[i] if i < len(filled) else np.full(vals.shape[1], np.nan)
+            out[p] = np.where(v0 != 0, last / v0 - 1.0, np.nan)
+    return pd.DataFrame(out, index=prices.columns, columns=list(PERIODS))
+
+def _row_to_dict(row: pd.Series) -> Dict[str, Optional[float]]:
+    return {p: (None if pd.isna(row.get(p)) else float(row[p])) for p in PERIODS}
+
 def compute_period_returns(series: pd.Series) -> Dict[str, Optional[float]]:
     """Retorna dict {D1,WTD,MTD,QTD,YTD,12M} como frações (0.0123=1.23%)."""
-    t = today_brt()
-    out = {
-        "D1": _d1_return(series),
-        "WTD": _return_from_start_to_last(series, start_of_week(t)),
-        "MTD": _return_from_start_to_last(series, start_of_month(t)),
-        "QTD": _return_from_start_to_last(series, start_of_quarter(t)),
-        "YTD": _return_from_start_to_last(series, start_of_year(t)),
-        "12M": _return_from_start_to_last(series, t - dt.timedelta(days=365)),
-    }
-    return out
+    table = compute_returns_table(series.to_frame("_"))
+    if table.empty:
+        return {p: None for p in PERIODS}
+    return _row_to_dict(table.iloc[0])
 
 # ------------------------
 # Mercado – interface pública
 # ------------------------
+def adjust_level(key: str, v: float) -> float:
+    """Nível exibido a partir do preço bruto do Yahoo."""
+    if key == "US10Y":
+        return v / 10.0  # ^TNX é em deci-pontos
+    return v
+
 class MarketData:
-    def __init__(self, win_ticker: Optional[str] = None, wdo_ticker: Optional[str] = None):
+    def __init__(self, win_ticker: Optional[str] = None, wdo_ticker: Optional[str] = None,
+                 as_of: Optional[dt.date] = None, lookback_days: int = 550):
+        """`as_of`: data de referência (HUD histórico); níveis e retornos usam só barras até ela."""
+        self.as_of = as_of
         # Tickers padrão (Yahoo)
         self.tickers = {
             "SPX": "^GSPC",
@@ -140,13 +244,17 @@ class MarketData:
             self.tickers["WDO"] = wdo_ticker
 
         # Carrega preços
-        self._prices = _download_prices(list(self.tickers.values()))
+        self._returns: Optional[pd.DataFrame] = None
+        if as_of is not None:
+            lookback_days += max(0, (today_brt() - as_of).days)
+        self._prices = _download_prices(list(self.tickers.values()), lookback_days)
 
         # Se DXY não veio, tenta fallback
         if "DX-Y.NYB" in self._prices.columns and self._prices["DX-Y.NYB"].dropna().empty:
-            alt = _download_prices(["^DXY"])
+            alt = _download_prices(["^DXY"], lookback_days)
             if not alt.empty:
                 self._prices["DX-Y.NYB"] = alt["^DXY"]
+        self._prices = prices_as_of(self._prices, as_of)
 
     def last_level(self, key: str) -> Optional[float]:
         """Último preço/nível."""
@@ -156,17 +264,23 @@ class MarketData:
         s = self._prices[t].dropna()
         if s.empty:
             return None
-        v = float(s.iloc[-1])
-        # Ajustes
-        if key == "US10Y":
-            return v / 10.0  # ^TNX é em deci-pontos
-        return v
+        return adjust_level(key, float(s.iloc[-1]))
+
+    def returns_table(self) -> pd.DataFrame:
+        """Retornos de todos os ativos (linhas=chave, ex.: 'SPX'; colunas=D1..12M), calculados uma vez."""
+        if self._returns is None:
+            table = compute_returns_table(self._prices, self.as_of)
+            by_key = {k: t for k, t in self.tickers.items() if t in table.index}
+            table = table.loc[list(by_key.values())]
+            table.index = pd.Index(list(by_key.keys()), name="key")
+            self._returns = table
+        return self._returns
 
     def returns(self, key: str) -> Dict[str, Optional[float]]:
-        t = self.tickers.get(key)
-        if not t or t not in self._prices.columns:
-            return {"D1": None, "WTD": None, "MTD": None, "QTD": None, "YTD": None, "12M": None}
-        return compute_period_returns(self._prices[t])
+        table = self.returns_table()
+        if key not in table.index:
+            return {p: None for p in PERIODS}
+        return _row_to_dict(table.loc[key])
 
 # ------------------------
 # Notícias (RSS)
@@ -178,37 +292,77 @@ RSS_SOURCES = [
     ("Bloomberg Línea", "https://www.bloomberglinea.com/feeds/latest/"),
 ]
 
-def fetch_latest_news(max_items: int = 6) -> List[Dict[str, str]]:
+NEWS_CACHE_NS = "news"
+NEWS_TIMEOUT_S = 10
+
+def _entry_to_item(source_name: str, e) -> Optional[Dict[str, str]]:
+    from dateutil import parser as dtparser
+    title = e.get("title", "").strip()
+    link = e.get("link", "").strip()
+    # published_parsed ou updated_parsed
+    pub = (
+        e.get("published") or e.get("updated") or
+        e.get("published_parsed") or e.get("updated_parsed")
+    )
+    try:
+        if isinstance(pub, str):
+            dt_obj = dtparser.parse(pub)
+        else:
+            dt_obj = dt.datetime(*pub[:6])  # time.struct_time
+        dt_brt = dt_obj.astimezone(BRT)
+        iso_brt = dt_brt.strftime("%Y-%m-%d %H:%M BRT")
+    except Exception:
+        iso_brt = ""
+    if not (title and link):
+        return None
+    return {"source": source_name, "title": title, "url": link, "date_brt": iso_brt}
+
+def _fetch_feed(source_name: str, url: str, timeout: float = NEWS_TIMEOUT_S) -> List[Dict[str, str]]:
+    """
+    Baixa um feed com GET condicional (ETag/Last-Modified). Em 304 (ou falha de rede)
+    devolve os itens já parseados do cache local, sem re-parse.
+    """
+    import http_client
+    import feedparser
+    cached = read_json(NEWS_CACHE_NS, source_name, default={}) or {}
+    headers = {}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("modified"):
+        headers["If-Modified-Since"] = cached["modified"]
+    try:
+        with span("market_provider.rss", source=source_name):
+            r = http_client.get(url, headers=headers, timeout=timeout, retries=1)
+        if r.status_code == 304:
+            return cached.get("items", [])
+        r.raise_for_status()
+    except Exception:
+        return cached.get("items", [])
+
+    feed = feedparser.parse(r.content)
+    items = [it for it in (_entry_to_item(source_name, e) for e in feed.entries) if it]
+    write_json(NEWS_CACHE_NS, source_name, {
+        "etag": r.headers.get("ETag"),
+        "modified": r.headers.get("Last-Modified"),
+        "items": items,
+    })
+    return items
+
+@traced
+def fetch_latest_news(max_items: int = 6, timeout: float = NEWS_TIMEOUT_S) -> List[Dict[str, str]]:
+    """Busca todos os RSS_SOURCES em paralelo (timeout por fonte) e retorna os mais recentes."""
+    from concurrent.futures import ThreadPoolExecutor
+    import contextvars
     items: List[Dict[str, str]] = []
-    for source_name, url in RSS_SOURCES:
-        try:
-            feed = feedparser.parse(url)
-            for e in feed.entries:
-                title = e.get("title", "").strip()
-                link = e.get("link", "").strip()
-                # published_parsed ou updated_parsed
-                pub = (
-                    e.get("published") or e.get("updated") or
-                    e.get("published_parsed") or e.get("updated_parsed")
-                )
-                try:
-                    if isinstance(pub, str):
-                        dt_obj = dtparser.parse(pub)
-                    else:
-                        dt_obj = dt.datetime(*pub[:6])  # time.struct_time
-                    dt_brt = dt_obj.astimezone(BRT)
-                    iso_brt = dt_brt.strftime("%Y-%m-%d %H:%M BRT")
-                except Exception:
-                    iso_brt = ""
-                if title and link:
-                    items.append({
-                        "source": source_name,
-                        "title": title,
-                        "url": link,
-                        "date_brt": iso_brt,
-                    })
-        except Exception:
-            continue
+    with ThreadPoolExecutor(max_workers=max(1, len(RSS_SOURCES))) as pool:
+        # copy_context: spans dos feeds caem no trace de quem chamou
+        futures = [pool.submit(contextvars.copy_context().run, _fetch_feed, name, url, timeout)
+                   for name, url in RSS_SOURCES]
+        for f in futures:
+            try:
+                items.extend(f.result())
+            except Exception:
+                continue
     # Ordena por data decrescente (quando possível)
     def _key(x):
         try:
@@ -221,56 +375,118 @@ def fetch_latest_news(max_items: int = 6) -> List[Dict[str, str]]:
 # ------------------------
 # Agenda Macro (opcional)
 # ------------------------
-def fetch_macro_agenda_tradingeconomics(api_key: Optional[str]) -> Tuple[str, str]:
+TE_CALENDAR_URL = "https://api.tradingeconomics.com/calendar"
+AGENDA_CACHE_NS = "agenda"
+AGENDA_POLL_S = 300  # intervalo mínimo (s) entre consultas de "Actual" pendentes
+
+def _te_get(path: str, api_key: str, **params) -> List[Dict]:
+    import http_client
+    with span("market_provider.tradingeconomics", path=path or "/"):
+        r = http_client.get(TE_CALENDAR_URL + path, params={"format": "json", "client": api_key, **params}, timeout=20)
+    r.raise_for_status()
+    data = r.json()
+    return data if isinstance(data, list) else []
+
+def _parse_event(ev: Dict) -> Optional[Dict[str, str]]:
+    """Evento cru do TE -> dict estruturado (horário parseado uma única vez)."""
+    from dateutil import parser as dtparser
+    country = (ev.get("Country") or "").lower()
+    if "brazil" in country:
+        country = "br"
+    elif "united states" in country:
+        country = "us"
+    else:
+        return None
+    time_utc = ev.get("DateUtc") or ev.get("Date")
+    try:
+        dt_utc = dtparser.parse(time_utc)
+        if dt_utc.tzinfo is None:
+            dt_utc = dt_utc.replace(tzinfo=dt.timezone.utc)
+        iso_utc = dt_utc.isoformat()
+        hhmm = dt_utc.astimezone(BRT).strftime("%H:%M")
+    except Exception:
+        iso_utc, hhmm = "", "--:--"
+    return {
+        "id": str(ev.get("CalendarId") or ""),
+        "country": country,
+        "time_utc": iso_utc,
+        "hhmm": hhmm,
+        "title": ev.get("Event") or ev.get("Category") or "Evento",
+        "actual": ev.get("Actual") or "",
+        "forecast": ev.get("Forecast") or "",
+        "previous": ev.get("Previous") or "",
+    }
+
+def _pending_actual(events: List[Dict[str, str]], now_utc: dt.datetime) -> List[Dict[str, str]]:
+    """Eventos cujo horário já passou e ainda sem 'Actual'."""
+    out = []
+    for e in events:
+        if e["actual"] or not e["time_utc"]:
+            continue
+        try:
+            if dt.datetime.fromisoformat(e["time_utc"]) <= now_utc:
+                out.append(e)
+        except ValueError:
+            continue
+    return out
+
+@traced
+def fetch_macro_events(api_key: Optional[str], day: Optional[dt.date] = None) -> List[Dict[str, str]]:
     """
-    Busca eventos para hoje no TradingEconomics (Brasil/EUA) se houver api_key.
-    Retorna (lista_brasil_md, lista_usa_md) como string pronta.
-    Obs.: você pode usar 'guest:guest' mas é limitado.
+    Agenda do dia (Brasil/EUA) como lista estruturada, com cache diário local.
+    A agenda completa é baixada uma vez por dia; depois só os eventos já ocorridos e sem
+    'Actual' são reconsultados (por CalendarId), no máximo a cada AGENDA_POLL_S.
     """
     if not api_key:
-        return "", ""
-
-    import requests
-    base = "https://api.tradingeconomics.com/calendar"
-    d = today_brt().isoformat()
-    params = {
-        "d1": d, "d2": d,
-        "c": "brazil,united states",
-        "format": "json",
-        "client": api_key
-    }
+        return []
+    d = (day or today_brt()).isoformat()
+    cached = read_json(AGENDA_CACHE_NS, d, default=None)
+    now = time.time()
+
+    if not cached:
+        try:
+            raw = _te_get("", api_key, d1=d, d2=d, c="brazil,united states")
+        except Exception:
+            return []
+        events = [e for e in (_parse_event(ev) for ev in raw) if e]
+        write_json(AGENDA_CACHE_NS, d, {"events": events, "polled_at": now})
+        return events
+
+    events = cached.get("events", [])
+    pending = _pending_actual(events, dt.datetime.now(dt.timezone.utc))
+    if not pending or now - cached.get("polled_at", 0) < AGENDA_POLL_S:
+        return events
     try:
-        r = requests.get(base, params=params, timeout=20)
-        r.raise_for_status()
-        data = r.json()
+        ids = [e["id"] for e in pending if e["id"]]
+        if len(ids) == len(pending):
+            raw = _te_get("/calendarid/" + ",".join(ids), api_key)
+        else:
+            raw = _te_get("", api_key, d1=d, d2=d, c="brazil,united states")
+        fresh = {e["id"]: e for e in (_parse_event(ev) for ev in raw) if e and e["id"]}
+        events = [fresh.get(e["id"], e) if e["id"] else e for e in events]
     except Exception:
-        return "", ""
+        pass
+    write_json(AGENDA_CACHE_NS, d, {"events": events, "polled_at": now})
+    return events
 
+def format_macro_agenda(events: List[Dict[str, str]]) -> Tuple[str, str]:
+    """Lista estruturada -> (lista_brasil_md, lista_usa_md)."""
     br_items, us_items = [], []
-    for ev in data:
-        country = (ev.get("Country") or "").lower()
-        time_utc = ev.get("DateUtc") or ev.get("Date")
-        title = ev.get("Event") or ev.get("Category") or "Evento"
-        actual = ev.get("Actual")
-        forecast = ev.get("Forecast")
-        previous = ev.get("Previous")
-        # horário para BRT
-        try:
-            dt_utc = dtparser.parse(time_utc)
-            dt_local = dt_utc.astimezone(BRT)
-            hhmm = dt_local.strftime("%H:%M")
-        except Exception:
-            hhmm = "--:--"
-        txt = f"- {hhmm} — {title}"
+    for e in events:
+        txt = f"- {e['hhmm']} — {e['title']}"
         det = []
-        if actual: det.append(f"Real: {actual}")
-        if forecast: det.append(f"Cons.: {forecast}")
-        if previous: det.append(f"Ant.: {previous}")
+        if e["actual"]: det.append(f"Real: {e['actual']}")
+        if e["forecast"]: det.append(f"Cons.: {e['forecast']}")
+        if e["previous"]: det.append(f"Ant.: {e['previous']}")
         if det:
             txt += " (" + " • ".join(det) + ")"
-        if "brazil" in country:
-            br_items.append(txt)
-        elif "united states" in country:
-            us_items.append(txt)
-
+        (br_items if e["country"] == "br" else us_items).append(txt)
     return ("\n".join(br_items), "\n".join(us_items))
+
+def fetch_macro_agenda_tradingeconomics(api_key: Optional[str]) -> Tuple[str, str]:
+    """
+    Busca eventos para hoje no TradingEconomics (Brasil/EUA) se houver api_key.
+    Retorna (lista_brasil_md, lista_usa_md) como string pronta.
+    Obs.: você pode usar 'guest:guest' mas é limitado.
+    """
+    return format_macro_agenda(fetch_macro_events(api_key))
@@ -1,10 +1,14 @@
 # metrics.py
 from __future__ import annotations
 from typing import Optional, Tuple, Dict
+import numpy as np
 import pandas as pd
 import datetime as dt
 import math
 
+from schema import to_float64
+from tracing import traced
+
 # ---------- Helpers de formato ----------
 def minutes_to_mmss(value: Optional[float]) -> str:
     if value is None or (isinstance(value,float) and (math.isnan(value) or value <= 0)):
@@ -54,6 +58,99 @@ def start_of_quarter(d: dt.date) -> dt.date:
 def start_of_year(d: dt.date) -> dt.date:
     return dt.date(d.year, 1, 1)
 
+# ---------- DailyFrame (datas parseadas e períodos pré-calculados) ----------
+DAILY_PERIODS = ("7D", "WTD", "MTD", "QTD", "YTD", "TOTAL")
+
+def period_start(period: str, today: dt.date) -> Optional[dt.date]:
+    """Início do período relativo a `today`; None para TOTAL (desde o primeiro registro)."""
+    if period == "7D":
+        return today - dt.timedelta(days=6)
+    if period == "WTD":
+        return start_of_week(today)
+    if period == "MTD":
+        return start_of_month(today)
+    if period == "QTD":
+        return start_of_quarter(today)
+    if period == "YTD":
+        return start_of_year(today)
+    return None
+
+class DailyFrame:
+    """
+    DailyHUD preparado uma única vez: 'Data' parseada, linhas sem data (ou após `today`)
+    removidas, ordenado, fatias posicionais por período (7D/WTD/MTD/QTD/YTD/TOTAL) e colunas
+    numéricas em cache. `today` é a data "as of" do HUD (padrão: hoje em BRT).
+    Todas as métricas diárias aceitam DailyFrame (ou o DataFrame cru, convertido na hora).
+    """
+    @traced
+    def __init__(self, daily_df: pd.DataFrame, today: Optional[dt.date] = None):
+        self.today = today or today_brt()
+        self.source = daily_df  # frame original (para refazer com outro "as of")
+        if "Data" in daily_df.columns:
+            d = daily_df
+            if not pd.api.types.is_datetime64_any_dtype(d["Data"]):  # já vem tipado via schema.py
+                d = d.assign(Data=pd.to_datetime(d["Data"], errors="coerce"))
+            d = d.dropna(subset=["Data"])
+            if not d["Data"].is_monotonic_increasing:
+                d = d.sort_values("Data", kind="stable")
+            # "as of": linhas posteriores a `today` não existem para este HUD
+            d = d.loc[d["Data"] < pd.Timestamp(self.today + dt.timedelta(days=1))].reset_index(drop=True)
+        else:
+            d = daily_df.iloc[0:0].copy()
+        self.df = d
+        self.has_dates = "Data" in daily_df.columns
+        self._days = d["Data"].dt.normalize().to_numpy() if self.has_dates else np.array([], dtype="datetime64[ns]")
+        self._num: Dict[str, pd.Series] = {}
+        self.aggregates = None  # aggregates.PeriodAggregates sincronizado (opcional)
+        self.slices: Dict[str, slice] = {p: self._slice(period_start(p, self.today), self.today) for p in DAILY_PERIODS}
+
+    def _pos(self, d: dt.date, side: str) -> int:
+        return int(self._days.searchsorted(np.datetime64(d, "ns"), side=side))
+
+    def _slice(self, start: Optional[dt.date], end: dt.date) -> slice:
+        lo = 0 if start is None else self._pos(start, "left")
+        return slice(lo, self._pos(end, "right"))
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+    def has(self, col: str) -> bool:
+        return self.has_dates and col in self.df.columns
+
+    def num(self, col: str) -> pd.Series:
+        """Coluna convertida para float64 (uma vez por coluna; o frame guarda o dtype compacto)."""
+        if col not in self._num:
+            self._num[col] = to_float64(self.df[col])
+        return self._num[col]
+
+    def values(self, col: str, period: str) -> pd.Series:
+        return self.num(col).iloc[self.slices[period]]
+
+    def period_stats(self, col: str, period: str) -> Tuple[float, int, int]:
+        """(soma, contagem não-NaN, nº de linhas) de `col` no período — O(1) com agregados anexados."""
+        agg = self.aggregates
+        if agg is not None and col in agg.pos:
+            acc, i = agg.stats(period, self.today), agg.pos[col]
+            return float(acc.sum[i]), int(acc.count[i]), acc.rows
+        vals = self.values(col, period)
+        return float(vals.sum()), int(vals.count()), len(vals)
+
+    def period_mean(self, col: str, period: str) -> Optional[float]:
+        s, n, _ = self.period_stats(col, period)
+        return s / n if n else None
+
+    def rows_on(self, d: dt.date) -> pd.DataFrame:
+        return self.df.iloc[self._pos(d, "left"):self._pos(d, "right")]
+
+    def last_row(self) -> pd.Series:
+        return self.df.iloc[-1] if not self.df.empty else pd.Series(dtype=object)
+
+def as_daily_frame(daily, as_of: Optional[dt.date] = None) -> DailyFrame:
+    if isinstance(daily, DailyFrame) and (as_of is None or daily.today == as_of):
+        return daily
+    return DailyFrame(daily.source if isinstance(daily, DailyFrame) else daily, as_of)
+
 # ---------- Energia / Sono / Stress ----------
 def energy_pct_from_row(row: pd.Series) -> Optional[int]:
     for col in ["Body Battery (máx)", "Body Battery (end)"]:
@@ -70,239 +167,285 @@ def energy_bar_10(pct: Optional[int]) -> str:
     filled = max(0, min(10, round(pct/10)))
     return "[" + "█"*filled + "·"*(10-filled) + "]"
 
-def stress_wtd_mean(daily_df: pd.DataFrame) -> Optional[float]:
-    if "Data" not in daily_df.columns or "Stress (média)" not in daily_df.columns:
+@traced
+def stress_wtd_mean(daily, as_of: Optional[dt.date] = None) -> Optional[float]:
+    d = as_daily_frame(daily, as_of)
+    if not d.has("Stress (média)"):
         return None
-    d = daily_df.copy()
-    d["Data"] = pd.to_datetime(d["Data"], errors="coerce")
-    d = d.dropna(subset=["Data"])
-    today = today_brt()
-    start = start_of_week(today)
-    d = d[d["Data"].dt.date.between(start, today)]
-    vals = pd.to_numeric(d["Stress (média)"], errors="coerce").dropna()
-    return float(vals.mean()) if not vals.empty else None
-
-def breathwork_today_and_7d(daily_df: pd.DataFrame) -> Tuple[int, int]:
+    return d.period_mean("Stress (média)", "WTD")
+
+@traced
+def breathwork_today_and_7d(daily, as_of: Optional[dt.date] = None) -> Tuple[int, int]:
     """Retorna (hoje_em_minutos, media_7d) — usa coluna 'Breathwork (min)'."""
-    if "Breathwork (min)" not in daily_df.columns or "Data" not in daily_df.columns:
+    d = as_daily_frame(daily, as_of)
+    if not d.has("Breathwork (min)"):
         return (0, 0)
-    d = daily_df.copy()
-    d["Data"] = pd.to_datetime(d["Data"], errors="coerce")
-    d = d.dropna(subset=["Data"]).sort_values("Data")
-    today = today_brt()
-    today_row = d[d["Data"].dt.date == today]
-    today_min = int(round(float(today_row["Breathwork (min)"].iloc[-1]))) if not today_row.empty and pd.notna(today_row["Breathwork (min)"].iloc[-1]) else 0
-    d7 = d[d["Data"].dt.date.between(today - dt.timedelta(days=6), today)]
-    avg7 = int(round(pd.to_numeric(d7["Breathwork (min)"], errors="coerce").fillna(0).mean())) if not d7.empty else 0
+    col = d.num("Breathwork (min)")
+    today_vals = col.iloc[d._slice(d.today, d.today)]
+    today_min = int(round(float(today_vals.iloc[-1]))) if not today_vals.empty and pd.notna(today_vals.iloc[-1]) else 0
+    s7, _, rows7 = d.period_stats("Breathwork (min)", "7D")
+    avg7 = int(round(s7 / rows7)) if rows7 else 0  # dias sem registro contam como 0
     return today_min, avg7
 
-def breathwork_streak_days(daily_df: pd.DataFrame) -> int:
+@traced
+def streak_days(daily, col: str, threshold: float = 0.0, above: bool = True,
+                as_of: Optional[dt.date] = None) -> Tuple[int, int]:
+    """
+    Streaks de dias corridos em que `col` > threshold (ou < threshold se above=False).
+    Retorna (streak_atual, maior_streak). A atual é a sequência mais recente, mesmo que
+    o(s) último(s) dia(s) não tenham batido a meta. Vetorizado (run-length nos dias que passam).
+    """
+    d = as_daily_frame(daily, as_of)
+    if not d.has(col) or d.empty:
+        return 0, 0
+    vals = d.num(col).to_numpy(dtype=float)
+    ok = (vals > threshold) if above else (vals < threshold)  # NaN -> False
+    days = np.unique(d._days[ok].astype("datetime64[D]").astype(np.int64))
+    if days.size == 0:
+        return 0, 0
+    run_id = np.concatenate(([0], np.cumsum(np.diff(days) != 1)))
+    lengths = np.bincount(run_id)
+    return int(lengths[-1]), int(lengths.max())
+
+def breathwork_streak_days(daily, as_of: Optional[dt.date] = None) -> int:
     """Conta dias consecutivos com 'Breathwork (min)' > 0 a partir do dia mais recente."""
-    if "Breathwork (min)" not in daily_df.columns or "Data" not in daily_df.columns:
-        return 0
-    d = daily_df.copy()
-    d["Data"] = pd.to_datetime(d["Data"], errors="coerce")
-    d = d.dropna(subset=["Data"]).sort_values("Data")
-    streak, last_date = 0, None
-    for _, row in d[::-1].iterrows():  # começa do mais recente
-        val = row.get("Breathwork (min)")
-        if pd.isna(val) or float(val) <= 0:
-            if last_date is None:
-                continue
-            else:
-                break
-        current_date = row["Data"].date()
-        if last_date is None:
-            streak = 1
-        else:
-            if (last_date - current_date).days == 1:
-                streak += 1
-            else:
-                break
-        last_date = current_date
-    return streak
+    return streak_days(daily, "Breathwork (min)", 0.0, as_of=as_of)[0]
 
-def sleep_period_avg(daily_df: pd.DataFrame, col: str, period: str) -> Optional[float]:
+@traced
+def sleep_period_avg(daily, col: str, period: str, as_of: Optional[dt.date] = None) -> Optional[float]:
     """Média de sono (h) para períodos WTD/MTD/QTD/YTD/7D/TOTAL."""
-    if "Data" not in daily_df.columns or col not in daily_df.columns:
+    d = as_daily_frame(daily, as_of)
+    if not d.has(col):
         return None
-    d = daily_df.copy()
-    d["Data"] = pd.to_datetime(d["Data"], errors="coerce")
-    d[col] = pd.to_numeric(d[col], errors="coerce")
-    d = d.dropna(subset=["Data"])
-    today = today_brt()
-    if period == "7D":
-        start = today - dt.timedelta(days=6)
-    elif period == "WTD":
-        start = start_of_week(today)
-    elif period == "MTD":
-        start = start_of_month(today)
-    elif period == "QTD":
-        start = start_of_quarter(today)
-    elif period == "YTD":
-        start = start_of_year(today)
-    else:  # TOTAL
-        start = d["Data"].min().date()
-    vals = d.loc[d["Data"].dt.date.between(start, today), col].dropna()
-    return float(vals.mean()) if not vals.empty else None
+    return d.period_mean(col, period if period in d.slices else "TOTAL")
 
 # ---------- Corrida (somente dias com corrida contam) ----------
-def running_daily_agg(acts_df: pd.DataFrame) -> pd.DataFrame:
-    """Agrupa por dia apenas atividades 'running' e calcula pace diário."""
-    if acts_df.empty:
-        return pd.DataFrame(columns=["Data","km","dur_min","pace_num","fc_mean","vo2_mean"])
-    df = acts_df.copy()
-    df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
-    df = df.dropna(subset=["Data"])
-    df = df[df["Tipo"].str.lower() == "running"]
-    if df.empty:
-        return pd.DataFrame(columns=["Data","km","dur_min","pace_num","fc_mean","vo2_mean"])
-    df["km"] = pd.to_numeric(df["Distância (km)"], errors="coerce")
-    df["dur_min"] = pd.to_numeric(df["Duração (min)"], errors="coerce")
-    grp = df.groupby(df["Data"].dt.normalize(), as_index=False).agg(
-        km=("km","sum"),
-        dur_min=("dur_min","sum"),
-        fc_mean=("FC Média","mean"),
-        vo2_mean=("VO2 Máx","mean")
-    )
-    grp["pace_num"] = grp.apply(lambda r: (r["dur_min"]/r["km"]) if (r["km"] and r["km"]>0) else float("nan"), axis=1)
-    grp.rename(columns={"Data":"DataDay"}, inplace=True)
-    return grp
-
-def running_last_session(acts_df: pd.DataFrame) -> Dict:
-    if acts_df.empty:
-        return {"date":"-","km":"-","pace":"-","fc":"-","vo2":"-"}
-    run = acts_df.copy()
-    run["Data"] = pd.to_datetime(run["Data"], errors="coerce")
-    run = run.dropna(subset=["Data"])
-    run = run[run["Tipo"].str.lower() == "running"]
-    if run.empty:
-        return {"date":"-","km":"-","pace":"-","fc":"-","vo2":"-"}
-    last = run.sort_values("Data").iloc[-1]
-    km = last.get("Distância (km)")
-    pace = last.get("Pace (min/km)")
-    fc = last.get("FC Média")
-    vo2 = last.get("VO2 Máx")
-    # pace pode vir como float (minutos) ou string "m:ss"
-    try:
-        if isinstance(pace, (int,float)):
-            pace_s = minutes_to_mmss(float(pace))
+RUN_AGG_COLUMNS = ["DataDay","km","dur_min","fc_mean","vo2_mean","pace_num"]
+EMPTY_RUN_SESSION = {"date":"-","km":"-","pace":"-","fc":"-","vo2":"-"}
+# períodos da corrida -> períodos do DailyFrame
+RUN_PERIODS = {"7D": "7D", "SEM": "WTD", "MES": "MTD", "TRIM": "QTD", "ANO": "YTD"}
+
+class RunningFrame:
+    """
+    Activities pré-processado uma vez: filtra Tipo == running, parseia/ordena datas e
+    agrega por dia (pace por divisão de arrays). Expõe última sessão, agregados diários
+    e pace médio por período a partir da mesma estrutura.
+    """
+    @traced
+    def __init__(self, acts_df: pd.DataFrame, today: Optional[dt.date] = None):
+        self.today = today or today_brt()
+        self.source = acts_df
+        if acts_df.empty or "Data" not in acts_df.columns or "Tipo" not in acts_df.columns:
+            runs = pd.DataFrame(columns=["Data"])
         else:
-            s = str(pace).strip()
-            if s and s != "nan":
-                pace_s = s
+            is_run = acts_df["Tipo"].astype(str).str.lower() == "running"
+            runs = acts_df.loc[is_run].copy()
+            runs["Data"] = pd.to_datetime(runs["Data"], errors="coerce")
+            runs = runs.dropna(subset=["Data"]).sort_values("Data", kind="stable")
+            runs = runs.loc[runs["Data"] < pd.Timestamp(self.today + dt.timedelta(days=1))].reset_index(drop=True)
+        self.runs = runs
+        self._set_daily(self._aggregate(runs))
+
+    @classmethod
+    def from_daily_agg(cls, agg_run: pd.DataFrame, today: Optional[dt.date] = None) -> "RunningFrame":
+        """Reconstrói a partir do df de running_daily_agg (sem sessões individuais)."""
+        rf = cls(pd.DataFrame(), today)
+        if not agg_run.empty:
+            daily = agg_run.copy()
+            daily["DataDay"] = pd.to_datetime(daily["DataDay"])
+            daily = daily.loc[daily["DataDay"] < pd.Timestamp(rf.today + dt.timedelta(days=1))]
+            rf._set_daily(daily.sort_values("DataDay", kind="stable").reset_index(drop=True))
+        return rf
+
+    def _set_daily(self, daily: pd.DataFrame) -> None:
+        self.daily = daily
+        self._days = daily["DataDay"].to_numpy(dtype="datetime64[ns]")
+
+    @staticmethod
+    def _aggregate(runs: pd.DataFrame) -> pd.DataFrame:
+        if runs.empty:
+            return pd.DataFrame(columns=RUN_AGG_COLUMNS)
+        def _num(col):
+            if col not in runs.columns:
+                return pd.Series(np.nan, index=runs.index)
+            return to_float64(runs[col])
+        base = pd.DataFrame({
+            "DataDay": runs["Data"].dt.normalize(),
+            "km": _num("Distância (km)"),
+            "dur_min": _num("Duração (min)"),
+            "fc_mean": _num("FC Média"),
+            "vo2_mean": _num("VO2 Máx"),
+        })
+        grp = base.groupby("DataDay", as_index=False, sort=True).agg(
+            km=("km","sum"), dur_min=("dur_min","sum"),
+            fc_mean=("fc_mean","mean"), vo2_mean=("vo2_mean","mean"),
+        )
+        km = grp["km"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            grp["pace_num"] = np.where(km > 0, grp["dur_min"].to_numpy(dtype=float) / km, np.nan)
+        return grp[RUN_AGG_COLUMNS]
+
+    @property
+    def empty(self) -> bool:
+        return self.daily.empty
+
+    def last_session(self) -> Dict:
+        if self.runs.empty:
+            return dict(EMPTY_RUN_SESSION)
+        last = self.runs.iloc[-1]
+        km = last.get("Distância (km)")
+        pace = last.get("Pace (min/km)")
+        fc = last.get("FC Média")
+        vo2 = last.get("VO2 Máx")
+        # pace pode vir como float (minutos) ou string "m:ss"
+        try:
+            if isinstance(pace, (int,float,np.number)):
+                pace_s = minutes_to_mmss(float(pace))
             else:
-                pace_s = "-"
-    except Exception:
-        pace_s = "-"
-    return {
-        "date": last["Data"].date().isoformat(),
-        "km": num_fmt(km, 2) if pd.notna(km) else "-",
-        "pace": pace_s,
-        "fc": num_fmt(fc, 0) if pd.notna(fc) else "-",
-        "vo2": num_fmt(vo2, 0) if pd.notna(vo2) else "-"
-    }
-
-def running_period_avg_pace(agg_run: pd.DataFrame, period: str) -> Optional[float]:
-    if agg_run.empty:
-        return None
-    today = today_brt()
-    if period == "7D":
-        start = today - dt.timedelta(days=6)
-    elif period == "SEM":  # semana atual
-        start = start_of_week(today)
-    elif period == "MES":
-        start = start_of_month(today)
-    elif period == "TRIM":
-        start = start_of_quarter(today)
-    elif period == "ANO":
-        start = start_of_year(today)
-    else:
-        return None
-    df = agg_run.copy()
-    df["DataDay"] = pd.to_datetime(df["DataDay"])
-    mask = df["DataDay"].dt.date.between(start, today)
-    vals = pd.to_numeric(df.loc[mask, "pace_num"], errors="coerce").dropna()
-    return float(vals.mean()) if not vals.empty else None
-
-def running_last_vo2(agg_run: pd.DataFrame) -> Optional[float]:
-    if agg_run.empty:
-        return None
-    df = agg_run.dropna(subset=["vo2_mean"]).sort_values("DataDay")
-    if df.empty:
-        return None
-    return float(df.iloc[-1]["vo2_mean"])
+                s = str(pace).strip()
+                if s and s != "nan":
+                    pace_s = s
+                else:
+                    pace_s = "-"
+        except Exception:
+            pace_s = "-"
+        return {
+            "date": last["Data"].date().isoformat(),
+            "km": num_fmt(km, 2) if pd.notna(km) else "-",
+            "pace": pace_s,
+            "fc": num_fmt(fc, 0) if pd.notna(fc) else "-",
+            "vo2": num_fmt(vo2, 0) if pd.notna(vo2) else "-"
+        }
+
+    def period_avg_pace(self, period: str) -> Optional[float]:
+        if self.empty or period not in RUN_PERIODS:
+            return None
+        start = period_start(RUN_PERIODS[period], self.today)
+        lo = int(self._days.searchsorted(np.datetime64(start, "ns"), side="left"))
+        hi = int(self._days.searchsorted(np.datetime64(self.today, "ns"), side="right"))
+        vals = self.daily["pace_num"].iloc[lo:hi].dropna()
+        return float(vals.mean()) if not vals.empty else None
+
+    def last_vo2(self) -> Optional[float]:
+        vo2 = self.daily["vo2_mean"].dropna() if not self.empty else pd.Series(dtype=float)
+        return float(vo2.iloc[-1]) if not vo2.empty else None
+
+def as_running_frame(acts, as_of: Optional[dt.date] = None) -> RunningFrame:
+    if isinstance(acts, RunningFrame) and (as_of is None or acts.today == as_of):
+        return acts
+    return RunningFrame(acts.source if isinstance(acts, RunningFrame) else acts, as_of)
+
+@traced
+def running_daily_agg(acts, as_of: Optional[dt.date] = None) -> pd.DataFrame:
+    """Agrupa por dia apenas atividades 'running' e calcula pace diário."""
+    return as_running_frame(acts, as_of).daily
+
+@traced
+def running_last_session(acts, as_of: Optional[dt.date] = None) -> Dict:
+    return as_running_frame(acts, as_of).last_session()
+
+def _agg_frame(agg_run, as_of: Optional[dt.date] = None) -> RunningFrame:
+    """Aceita RunningFrame ou o df de running_daily_agg (colunas RUN_AGG_COLUMNS)."""
+    if isinstance(agg_run, RunningFrame):
+        return as_running_frame(agg_run, as_of)
+    return RunningFrame.from_daily_agg(agg_run, as_of)
+
+@traced
+def running_period_avg_pace(agg_run, period: str, as_of: Optional[dt.date] = None) -> Optional[float]:
+    return _agg_frame(agg_run, as_of).period_avg_pace(period)
+
+@traced
+def running_last_vo2(agg_run, as_of: Optional[dt.date] = None) -> Optional[float]:
+    return _agg_frame(agg_run, as_of).last_vo2()
 
 # ---------- Insights Table ----------
-def build_insights_table_md(daily_df: pd.DataFrame) -> str:
-    """Gera a tabela Markdown (WTD/MTD/QTD/YTD/TOTAL) com as métricas do exemplo."""
-    d = daily_df.copy()
-    if "Data" not in d.columns:
-        return "_Sem dados_"
-    d["Data"] = pd.to_datetime(d["Data"], errors="coerce")
-    d = d.dropna(subset=["Data"])
-    # Tranformações auxiliares
-    if "Pace (min/km)" in d.columns and "PaceNum" not in d.columns:
-        d["PaceNum"] = pd.to_numeric(d["Pace (min/km)"], errors="coerce")
-    if "Sono (h)" in d.columns and "SonoHorasNum" not in d.columns:
-        d["SonoHorasNum"] = pd.to_numeric(d["Sono (h)"], errors="coerce")
-
-    items = [
-        ("Sono (h) — Média",          "SonoHorasNum", "mean", "time"),
-        ("Sono Deep (h) — Média",     "Sono Deep (h)","mean", "time"),
-        ("Sono REM (h) — Média",      "Sono REM (h)", "mean", "time"),
-        ("Sono Light (h) — Média",    "Sono Light (h)","mean","time"),
-        ("Qualidade do sono (score)", "Sono (score)", "mean", "num"),
-        ("Distância corrida (km) — Soma","Corrida (km)","sum","num"),
-        ("Distância corrida (km) — Média","Corrida (km)","mean","num"),
-        ("Pace médio (min/km)",       "PaceNum",      "mean","pace"),
-        ("Passos — Média",            "Passos",       "mean","int"),
-        ("Calorias (total dia) — Média","Calorias (total dia)","mean","num"),
-        ("Body Battery (máx)",        "Body Battery (máx)","mean","num"),
-        ("Stress médio",              "Stress (média)","mean","num"),
-        ("Breathwork (min) — Média",  "Breathwork (min)","mean","int"),
-    ]
-    periods = [("WTD","WTD"), ("MTD","MTD"), ("QTD","QTD"), ("YTD","YTD"), ("TOTAL","TOTAL")]
-
-    def _period_mask(df, pcode):
-        t = today_brt()
-        if pcode == "WTD":
-            start = start_of_week(t)
-        elif pcode == "MTD":
-            start = start_of_month(t)
-        elif pcode == "QTD":
-            start = start_of_quarter(t)
-        elif pcode == "YTD":
-            start = start_of_year(t)
-        else:
-            start = df["Data"].min().date()
-        return df["Data"].dt.date.between(start, t)
-
-    # Computa valores e formata
-    rows = []
-    for name, col, mode, fmt in items:
-        if col not in d.columns:
-            rows.append([name] + ["-"]*len(periods))
-            continue
-        line = [name]
-        for _, p in periods:
-            sub = d.loc[_period_mask(d, p), col]
-            vals = pd.to_numeric(sub, errors="coerce").dropna()
-            if vals.empty:
-                line.append("-")
-                continue
-            val = float(vals.sum() if mode=="sum" else vals.mean())
-            if fmt == "time":
-                line.append(hours_to_hhmm(val))
-            elif fmt == "pace":
-                line.append(minutes_to_mmss(val))
-            elif fmt == "int":
-                line.append(int_fmt(val))
-            else:
-                line.append(num_fmt(val, 2))
-        rows.append(line)
+# (rótulo, coluna do DailyHUD, agregação "mean"/"sum", formato "time"/"pace"/"int"/"num")
+# >>> MANUAL INPUT (opcional): adicione linhas aqui; o custo do cálculo não cresce por linha.
+INSIGHTS_METRICS = [
+    ("Sono (h) — Média",          "Sono (h)",     "mean", "time"),
+    ("Sono Deep (h) — Média",     "Sono Deep (h)","mean", "time"),
+    ("Sono REM (h) — Média",      "Sono REM (h)", "mean", "time"),
+    ("Sono Light (h) — Média",    "Sono Light (h)","mean","time"),
+    ("Qualidade do sono (score)", "Sono (score)", "mean", "num"),
+    ("Distância corrida (km) — Soma","Corrida (km)","sum","num"),
+    ("Distância corrida (km) — Média","Corrida (km)","mean","num"),
+    ("Pace médio (min/km)",       "Pace (min/km)","mean","pace"),
+    ("Passos — Média",            "Passos",       "mean","int"),
+    ("Calorias (total dia) — Média","Calorias (total dia)","mean","num"),
+    ("Body Battery (máx)",        "Body Battery (máx)","mean","num"),
+    ("Stress médio",              "Stress (média)","mean","num"),
+    ("Breathwork (min) — Média",  "Breathwork (min)","mean","int"),
+]
+INSIGHTS_PERIODS = ("WTD", "MTD", "QTD", "YTD", "TOTAL")
+
+@traced
+def insights_values(daily, metrics=None, periods=INSIGHTS_PERIODS, as_of: Optional[dt.date] = None) -> pd.DataFrame:
+    """
+    Valores numéricos da tabela (linhas=rótulo, colunas=períodos; NaN sem dados).
+    Matriz de todas as colunas; cada período (fatia posicional contígua do DailyFrame) é
+    reduzido direto (soma/contagem por coluna) — mesmo arredondamento do cálculo por Series.
+    """
+    metrics = INSIGHTS_METRICS if metrics is None else metrics
+    d = as_daily_frame(daily, as_of)
+    names = [m[0] for m in metrics]
+    out = pd.DataFrame(np.nan, index=pd.Index(names), columns=list(periods))
+    cols = list(dict.fromkeys(m[1] for m in metrics if d.has(m[1])))
+    if not cols or d.empty:
+        return out
 
-    # Monta markdown
-    header = "| Métrica | WTD | MTD | QTD | YTD | TOTAL |\n|---|---:|---:|---:|---:|---:|"
-    body = "\n".join([f"| {r[0]} | {r[1]} | {r[2]} | {r[3]} | {r[4]} | {r[5]} |" for r in rows])
-    return header + "\n" + body
+    agg = d.aggregates
+    if agg is not None and all(c in agg.pos for c in cols):
+        # Agregados incrementais: cada (período, coluna) sai do acumulado, sem varrer o histórico
+        idx = [agg.pos[c] for c in cols]
+        stats = [agg.stats(p, d.today) for p in periods]
+        sums = np.array([acc.sum[idx] for acc in stats])
+        cnts = np.array([acc.count[idx] for acc in stats])
+        return _insights_frame(out, metrics, cols, sums, cnts)
+
+    # Colunas contíguas (ordem F): a soma de cada coluna segue a mesma ordem de Series.sum
+    mat = np.asfortranarray(np.column_stack([d.num(c).to_numpy(dtype=float) for c in cols]))
+    blocks = [mat[d.slices[p]] for p in periods]
+    sums = np.array([np.nansum(b, axis=0) for b in blocks])   # (períodos, colunas)
+    cnts = np.array([(~np.isnan(b)).sum(axis=0) for b in blocks])
+    return _insights_frame(out, metrics, cols, sums, cnts)
+
+def _insights_frame(out: pd.DataFrame, metrics, cols, sums: np.ndarray, cnts: np.ndarray) -> pd.DataFrame:
+    """Preenche `out` com soma ou média (matrizes períodos x colunas) de cada métrica."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.where(cnts > 0, sums / cnts, np.nan)
+    sums = np.where(cnts > 0, sums, np.nan)
+    col_pos = {c: i for i, c in enumerate(cols)}
+    for name, col, mode, _ in metrics:
+        if col in col_pos:
+            out.loc[name] = (sums if mode == "sum" else means)[:, col_pos[col]]
+    return out
+
+def _fmt_insight(val: float, fmt: str) -> str:
+    if pd.isna(val):
+        return "-"
+    if fmt == "time":
+        return hours_to_hhmm(val)
+    if fmt == "pace":
+        return minutes_to_mmss(val)
+    if fmt == "int":
+        return int_fmt(val)
+    return num_fmt(val, 2)
+
+def format_insights_table_md(values: pd.DataFrame, metrics=None) -> str:
+    """Formata o resultado de insights_values como tabela Markdown."""
+    metrics = INSIGHTS_METRICS if metrics is None else metrics
+    periods = list(values.columns)
+    header = "| Métrica | " + " | ".join(periods) + " |\n|---|" + "---:|" * len(periods)
+    lines = []
+    for name, _, _, fmt in metrics:
+        cells = [_fmt_insight(float(v), fmt) for v in values.loc[name].to_numpy()]
+        lines.append(f"| {name} | " + " | ".join(cells) + " |")
+    return header + "\n" + "\n".join(lines)
+
+@traced
+def build_insights_table_md(daily, metrics=None, as_of: Optional[dt.date] = None) -> str:
+    """Gera a tabela Markdown (WTD/MTD/QTD/YTD/TOTAL) com as métricas de INSIGHTS_METRICS."""
+    d = as_daily_frame(daily, as_of)
+    if not d.has_dates:
+        return "_Sem dados_"
+    return format_insights_table_md(insights_values(d, metrics), metrics)
@@ -1,10 +1,16 @@
 # notion_client.py
 from __future__ import annotations
-from typing import Tuple, Optional
-import requests
+from typing import List, Tuple, Optional
+import hashlib
 import json
 
+from local_store import read_json, write_json
+from tracing import traced
+
 NOTION_VERSION = "2022-06-28"
+RICH_TEXT_MAX = 2000     # limite do Notion por item de rich_text
+NOTION_CACHE_NS = "notion"
+SECTION_SEP = "\n---\n"  # separador de seções do TEMPLATE
 
 def _headers(token: str) -> dict:
     return {
@@ -16,19 +22,88 @@ def _headers(token: str) -> dict:
 def _normalize_id(i: str) -> str:
     return (i or "").replace("-", "").strip()
 
-def push_code_block(block_id: str, content: str, token: str) -> Tuple[bool, str]:
-    """Atualiza um code block existente (PATCH /v1/blocks/{id})."""
+def parse_block_ids(spec: Optional[str]) -> List[str]:
+    """'id1,id2,...' -> lista de ids (um bloco = HUD inteiro; vários = uma seção por bloco)."""
+    return [_normalize_id(x) for x in (spec or "").split(",") if _normalize_id(x)]
+
+def _u16len(s: str) -> int:
+    # O Notion conta caracteres em UTF-16 (emoji = 2)
+    return len(s.encode("utf-16-le")) // 2
+
+def chunk_rich_text(content: str, limit: int = RICH_TEXT_MAX) -> List[str]:
+    """Quebra o conteúdo em pedaços <= limit, preferindo fronteiras de linha."""
+    chunks: List[str] = []
+    cur, cur_len = "", 0
+    for line in content.splitlines(keepends=True):
+        n = _u16len(line)
+        if cur_len + n <= limit:
+            cur, cur_len = cur + line, cur_len + n
+            continue
+        if cur:
+            chunks.append(cur)
+            cur, cur_len = "", 0
+        while n > limit:  # linha maior que o limite: corte duro
+            piece, size = "", 0
+            for ch in line:
+                w = _u16len(ch)
+                if size + w > limit:
+                    break
+                piece, size = piece + ch, size + w
+            chunks.append(piece)
+            line = line[len(piece):]
+            n = _u16len(line)
+        cur, cur_len = line, n
+    if cur or not chunks:
+        chunks.append(cur)
+    return chunks
+
+def split_sections(content: str, n: int) -> List[str]:
+    """Divide o HUD nas seções separadas por '---' para n blocos (excedente vai no último)."""
+    parts = content.split(SECTION_SEP)
+    if len(parts) > n:
+        parts = parts[:n-1] + [SECTION_SEP.join(parts[n-1:])]
+    return parts + [""] * (n - len(parts))
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+@traced
+def push_code_block(block_id: str, content: str, token: str, force: bool = False) -> Tuple[bool, str]:
+    """Atualiza um code block existente (PATCH /v1/blocks/{id}); pula se o conteúdo não mudou."""
+    bid = _normalize_id(block_id)
+    digest = _content_hash(content)
+    if not force and (read_json(NOTION_CACHE_NS, bid, default={}) or {}).get("hash") == digest:
+        return True, "Sem mudanças (envio ignorado)."
     try:
+        import http_client  # requests só é carregado quando há envio
         payload = {
             "code": {
-                "rich_text": [{"type":"text","text":{"content": content}}],
+                "rich_text": [{"type":"text","text":{"content": c}} for c in chunk_rich_text(content)],
                 "language": "plain text"
             }
         }
-        url = f"https://api.notion.com/v1/blocks/{_normalize_id(block_id)}"
-        r = requests.patch(url, headers=_headers(token), data=json.dumps(payload), timeout=30)
+        url = f"https://api.notion.com/v1/blocks/{bid}"
+        r = http_client.patch(url, headers=_headers(token), data=json.dumps(payload), timeout=30)
         if r.status_code == 200:
+            write_json(NOTION_CACHE_NS, bid, {"hash": digest})
             return True, "Atualizado!"
         return False, f"HTTP {r.status_code}: {r.text}"
     except Exception as e:
         return False, str(e)
+
+def push_code_blocks(block_ids: List[str], content: str, token: str, force: bool = False) -> Tuple[bool, str]:
+    """
+    Publica o HUD em um ou mais code blocks. Com vários blocos, cada um recebe uma seção
+    e só as seções alteradas geram PATCH.
+    """
+    if not block_ids:
+        return False, "Nenhum block_id configurado."
+    if len(block_ids) == 1:
+        return push_code_block(block_ids[0], content, token, force)
+    results = [push_code_block(bid, sec, token, force)
+               for bid, sec in zip(block_ids, split_sections(content, len(block_ids)))]
+    failures = [msg for ok, msg in results if not ok]
+    if failures:
+        return False, "; ".join(failures)
+    updated = sum(1 for _, msg in results if msg == "Atualizado!")
+    return True, f"{updated}/{len(block_ids)} blocos atualizados."
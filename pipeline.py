@@ -0,0 +1,61 @@
+# pipeline.py
+# Executor simples para as fontes do HUD: dispara todos os estágios I/O em paralelo
+# e entrega cada resultado assim que pedido/pronto, com timeout por estágio.
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeout
+import contextvars
+import time
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[], Any]
+    timeout: float = 60.0          # segundos, contados a partir do start()
+    default: Any = None            # valor usado em timeout/erro
+    required: bool = False         # True -> erro/timeout é propagado
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], max_workers: Optional[int] = None):
+        self.stages: Dict[str, Stage] = {s.name: s for s in stages}
+        self.errors: Dict[str, str] = {}
+        self.elapsed: Dict[str, float] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or max(1, len(stages)), thread_name_prefix="hud")
+        self._futures: Dict[str, Future] = {}
+        self._t0 = 0.0
+
+    def start(self) -> "Pipeline":
+        self._t0 = time.perf_counter()
+        for name, st in self.stages.items():
+            # cada estágio roda numa cópia do contexto de quem chamou (trace ativo do tracing.py)
+            ctx = contextvars.copy_context()
+            self._futures[name] = self._pool.submit(ctx.run, self._timed, name, st.fn)
+        return self
+
+    def _timed(self, name: str, fn: Callable[[], Any]) -> Any:
+        t = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            self.elapsed[name] = time.perf_counter() - t
+
+    def result(self, name: str) -> Any:
+        """Espera o estágio até o seu prazo; em erro/timeout devolve `default` (ou propaga se required)."""
+        st = self.stages[name]
+        remaining = max(0.0, st.timeout - (time.perf_counter() - self._t0))
+        try:
+            return self._futures[name].result(timeout=remaining)
+        except FutureTimeout:
+            self.errors[name] = f"timeout após {st.timeout:g}s"
+            if st.required:
+                raise TimeoutError(f"Estágio '{name}': {self.errors[name]}")
+        except Exception as e:
+            self.errors[name] = str(e)
+            if st.required:
+                raise
+        return st.default
+
+    def shutdown(self) -> None:
+        """Não bloqueia em estágios atrasados (já foram substituídos pelo default)."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
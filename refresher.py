@@ -0,0 +1,85 @@
+# refresher.py
+# Modo daemon (python main.py --serve-refresh): mantém cada fonte atualizada na sua cadência
+# e regrava o HUD pronto (contexto + markdown) para o app.py abrir instantaneamente.
+# Com --intraday, o histórico diário de mercado é carregado uma vez por pregão e os níveis/retornos
+# andam por polling de barras de 1 minuto (intraday.py).
+from __future__ import annotations
+from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, Future
+import time
+
+from hud_core import (
+    SOURCE_NAMES, SOURCE_DEFAULTS, source_fetchers, context_from_sources, save_latest,
+)
+from intraday import IntradayMarket, QuoteSource
+from local_store import DiskCache
+from tracing import trace
+
+# Cadência (s) de atualização de cada fonte
+REFRESH_INTERVALS = {"sheets": 120, "market": 300, "news": 180, "agenda": 300}  # >>> MANUAL INPUT (opcional)
+RENDER_EVERY_S = 60   # re-render mesmo sem fonte nova (relógio do HUD)
+TICK_S = 5
+INTRADAY_POLL_S = 30  # >>> MANUAL INPUT (opcional): cadência do polling de barras (--intraday)
+
+def serve_refresh(cfg, client, output_path: str = "hud_output.md", intraday: bool = False,
+                  quote_source: Optional[QuoteSource] = None) -> None:
+    """`intraday`: mercado ao vivo por barras de 1 min; `quote_source` troca o Yahoo (ex.: ReplayQuotes)."""
+    cache = DiskCache()
+    sources: Dict[str, Any] = {n: SOURCE_DEFAULTS.get(n) for n in SOURCE_NAMES}
+    errors: Dict[str, str] = {}
+    last_run: Dict[str, float] = {n: 0.0 for n in SOURCE_NAMES}
+    running: Dict[str, Future] = {}
+    last_render = 0.0
+    dirty = False
+    live: Optional[IntradayMarket] = None
+
+    with ThreadPoolExecutor(max_workers=len(SOURCE_NAMES) + 1, thread_name_prefix="refresh") as pool:
+        print("Refresher ativo (Ctrl+C para sair).")
+        try:
+            while True:
+                now = time.time()
+                # Dispara fontes vencidas (recria fetchers: chaves dependem do dia)
+                fetchers = source_fetchers(cfg, client)
+                for name in SOURCE_NAMES:
+                    due = now - last_run[name] >= REFRESH_INTERVALS[name]
+                    if intraday and name == "market" and live is not None:
+                        # histórico diário só na virada do pregão; se a recarga falhar, tenta de novo
+                        # na cadência normal (não a cada TICK_S)
+                        due = due and live.stale()
+                    if name not in running and due:
+                        key, fn = fetchers[name]
+                        running[name] = pool.submit(cache.get_or_set, key, 0, fn, True)
+                        last_run[name] = now
+                # Polling intradiário: só barras novas sobre o MarketData já carregado
+                if live is not None and "intraday" not in running and now - last_run.get("intraday", 0.0) >= INTRADAY_POLL_S:
+                    running["intraday"] = pool.submit(live.poll)
+                    last_run["intraday"] = now
+                # Coleta as que terminaram
+                for name, fut in list(running.items()):
+                    if not fut.done():
+                        continue
+                    del running[name]
+                    try:
+                        result = fut.result()
+                        errors.pop(name, None)
+                        if name == "intraday":
+                            dirty = dirty or result > 0
+                            continue
+                        if name == "market" and intraday and result is not None:
+                            live = result = IntradayMarket(result, source=quote_source)
+                        sources[name] = result
+                        dirty = True
+                    except Exception as e:
+                        errors[name] = str(e)
+                # Re-render quando chegou dado novo (ou a cada RENDER_EVERY_S)
+                if sources["sheets"] is not None and (dirty or now - last_render >= RENDER_EVERY_S):
+                    with trace("refresh_render"):
+                        ctx = context_from_sources(cfg, client, sources, errors)
+                        hud_md = ctx.render()
+                    save_latest(ctx, hud_md)
+                    with open(output_path, "w", encoding="utf-8") as f:
+                        f.write(hud_md)
+                    last_render, dirty = now, False
+                time.sleep(TICK_S)
+        except KeyboardInterrupt:
+            print("Refresher encerrado.")
@@ -1,13 +1,54 @@
 # renderer.py
 from __future__ import annotations
-from typing import Dict
+from typing import Dict, List, Tuple
+from functools import lru_cache
+import re
 
+from tracing import traced
+
+PLACEHOLDER_RE = re.compile(r"\{\{([A-Z0-9_]+)\}\}")
+MISSING_VALUE = "—"
+
+class CompiledTemplate:
+    """
+    Template tokenizado uma vez em segmentos literais e placeholders.
+    Renderizar é uma única passada (join), independente do nº de chaves do mapping.
+    """
+    def __init__(self, template: str):
+        self.literals: List[str] = []
+        self.keys: List[str] = []
+        pos = 0
+        for m in PLACEHOLDER_RE.finditer(template):
+            self.literals.append(template[pos:m.start()])
+            self.keys.append(m.group(1))
+            pos = m.end()
+        self.literals.append(template[pos:])
+        self.key_set = frozenset(self.keys)
+
+    def render(self, mapping: Dict[str, str]) -> str:
+        """Substitui placeholders por valores do mapping. Ausentes viram '—'."""
+        parts = [self.literals[0]]
+        for key, lit in zip(self.keys, self.literals[1:]):
+            v = mapping.get(key)
+            parts.append(MISSING_VALUE if v is None and key not in mapping else str(v))
+            parts.append(lit)
+        return "".join(parts)
+
+    def check(self, mapping: Dict[str, str]) -> Tuple[List[str], List[str]]:
+        """Retorna (chaves_ausentes_no_mapping, chaves_do_mapping_não_usadas)."""
+        missing = sorted(self.key_set - mapping.keys())
+        unused = sorted(set(mapping) - self.key_set)
+        return missing, unused
+
+@lru_cache(maxsize=16)
+def compile_template(template: str) -> CompiledTemplate:
+    return CompiledTemplate(template)
+
+@traced
 def render_template(template: str, mapping: Dict[str, str]) -> str:
     """Substitui {{PLACEHOLDER}} por valores em mapping. Ausentes viram '—'."""
-    out = template
-    for k, v in mapping.items():
-        out = out.replace(f"{{{{{k}}}}}", str(v))
-    # placeholders não preenchidos -> traço
-    import re
-    out = re.sub(r"\{\{[A-Z0-9_]+\}\}", "—", out)
-    return out
+    return compile_template(template).render(mapping)
+
+def check_template(template: str, mapping: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """(placeholders sem valor no mapping, chaves do mapping que o template não usa)."""
+    return compile_template(template).check(mapping)
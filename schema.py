@@ -0,0 +1,112 @@
+# schema.py
+# Schema declarado das abas DailyHUD/Activities: cada coluna vai direto para um dtype compacto
+# (float32 para sinais vitais, inteiros anuláveis pequenos para contagens, category para textos
+# repetidos, datetime64 para 'Data'). Colunas fora do schema ficam como vieram.
+from __future__ import annotations
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+# >>> MANUAL INPUT (opcional): coluna -> dtype ("datetime", "float32", "Int8/16/32", "category", "numeric")
+DAILY_SCHEMA: Dict[str, str] = {
+    "Data": "datetime",
+    "Sono (h)": "float32", "Sono Deep (h)": "float32", "Sono REM (h)": "float32", "Sono Light (h)": "float32",
+    "Sono (score)": "Int8",
+    "Body Battery (start)": "Int8", "Body Battery (end)": "Int8",
+    "Body Battery (mín)": "Int8", "Body Battery (máx)": "Int8",
+    "Stress (média)": "Int8",
+    "Passos": "Int32",
+    "Calorias (total dia)": "Int16",
+    "Corrida (km)": "float32",
+    "Pace (min/km)": "float32",
+    "Breathwork (min)": "Int16",
+}
+ACTIVITIES_SCHEMA: Dict[str, str] = {
+    "Data": "datetime",
+    "Tipo": "category",
+    "Distância (km)": "float32",
+    "Duração (min)": "float32",
+    "FC Média": "Int16",
+    "VO2 Máx": "float32",
+    "Pace (min/km)": "numeric",  # float (min) ou texto "m:ss": só converte se tudo for numérico
+}
+SCHEMAS = {"DailyHUD": DAILY_SCHEMA, "Activities": ACTIVITIES_SCHEMA}
+
+def _to_int(s: pd.Series, dtype: str) -> pd.Series:
+    """Inteiro anulável se os valores forem inteiros e couberem no tipo; senão float32."""
+    num = pd.to_numeric(s, errors="coerce")
+    vals = num.dropna().to_numpy(dtype=float)
+    info = np.iinfo(dtype.lower())
+    if vals.size and (np.any(vals % 1 != 0) or vals.min() < info.min or vals.max() > info.max):
+        return num.astype("float32")
+    return num.astype(dtype)
+
+FLOAT32_DIGITS = 6  # float32 guarda ~7 dígitos significativos
+
+def to_float64(s: pd.Series) -> pd.Series:
+    """
+    Coluna numérica em float64 para cálculo. Se veio em float32, arredonda a FLOAT32_DIGITS
+    dígitos significativos (recupera o decimal da planilha: 7.3f -> 7.3, não 7.30000019).
+    """
+    num = pd.to_numeric(s, errors="coerce")
+    out = num.astype("float64")
+    if num.dtype == np.float32 and out.notna().any():
+        top = float(np.nanmax(np.abs(out.to_numpy())))
+        if top > 0:
+            out = out.round(max(0, FLOAT32_DIGITS - int(np.ceil(np.log10(top)))))
+    return out
+
+def convert_column(s: pd.Series, kind: str) -> pd.Series:
+    if kind == "datetime":
+        return s if pd.api.types.is_datetime64_any_dtype(s) else pd.to_datetime(s, errors="coerce")
+    if kind == "category":
+        return s if isinstance(s.dtype, pd.CategoricalDtype) else s.astype("category")
+    if kind == "float32":
+        return s if s.dtype == np.float32 else pd.to_numeric(s, errors="coerce").astype("float32")
+    if kind.startswith("Int"):
+        return s if str(s.dtype) in (kind, "float32") else _to_int(s, kind)
+    if kind == "numeric":
+        if pd.api.types.is_numeric_dtype(s):
+            return s.astype("float32")
+        num = pd.to_numeric(s, errors="coerce")
+        return num.astype("float32") if num.notna().sum() == s.notna().sum() else s
+    raise ValueError(f"dtype de schema desconhecido: {kind}")
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """Colunas do schema convertidas (idempotente; não altera o original nem copia se já tipado)."""
+    if df is None or df.empty:
+        return pd.DataFrame() if df is None else df
+    changed = {}
+    for c in df.columns:
+        if c in schema:
+            s = convert_column(df[c], schema[c])
+            if s.dtype != df[c].dtype:
+                changed[c] = s
+    if not changed:
+        return df  # já tipado: sem cópia
+    out = df.copy(deep=False)
+    for c, s in changed.items():
+        out[c] = s
+    return out
+
+def apply_schemas(sheets: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Aplica SCHEMAS às abas conhecidas; as demais (ex.: Turtle) passam direto."""
+    return {name: apply_schema(df, SCHEMAS[name]) if name in SCHEMAS else df for name, df in sheets.items()}
+
+# ---------- Relatório de memória ----------
+def memory_report(frames: Dict[str, pd.DataFrame]) -> List[Dict]:
+    """[{frame, rows, cols, bytes}] com memory_usage(deep=True) (inclui strings)."""
+    return [
+        {"frame": name, "rows": len(df), "cols": df.shape[1], "bytes": int(df.memory_usage(deep=True).sum())}
+        for name, df in frames.items() if isinstance(df, pd.DataFrame)
+    ]
+
+def format_memory_report(raw: Dict[str, pd.DataFrame], typed: Dict[str, pd.DataFrame]) -> str:
+    """Tabela texto: memória por aba antes/depois do schema."""
+    before = {r["frame"]: r for r in memory_report(raw)}
+    lines = [f"{'aba':<12} {'linhas':>8} {'bruto (KiB)':>12} {'schema (KiB)':>13} {'redução':>8}"]
+    for r in memory_report(typed):
+        b = before.get(r["frame"], r)["bytes"]
+        cut = 1 - r["bytes"] / b if b else 0.0
+        lines.append(f"{r['frame']:<12} {r['rows']:>8} {b / 1024:>12.1f} {r['bytes'] / 1024:>13.1f} {cut:>8.0%}")
+    return "\n".join(lines)
@@ -3,12 +3,28 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional, Dict, Any
 import os
+import sys
 
-try:
-    import streamlit as st
-    SECRETS = st.secrets
-except Exception:
-    SECRETS = None
+# st.secrets só é carregado se estivermos dentro do Streamlit ou houver secrets.toml
+# (importar streamlit custa caro num run de CLI/cron sem secrets).
+SECRETS_PATHS = [
+    os.path.join(".streamlit", "secrets.toml"),
+    os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+]
+_SECRETS_UNSET = object()
+_secrets = _SECRETS_UNSET
+
+def _load_secrets():
+    global _secrets
+    if _secrets is _SECRETS_UNSET:
+        _secrets = None
+        if "streamlit" in sys.modules or any(os.path.exists(p) for p in SECRETS_PATHS):
+            try:
+                import streamlit as st
+                _secrets = st.secrets
+            except Exception:
+                _secrets = None
+    return _secrets
 
 @dataclass
 class Settings:
@@ -44,9 +60,10 @@ class Settings:
     livro_progresso: str
 
 def _get_secret(path: str, default=None):
-    if not SECRETS:
+    secrets = _load_secrets()
+    if not secrets:
         return default
-    cur = SECRETS
+    cur = secrets
     try:
         for k in path.split("."):
             cur = cur[k]
@@ -67,7 +84,7 @@ def load_settings() -> Settings:
     gcp_sa_file = os.getenv("GCP_SERVICE_ACCOUNT_FILE")
 
     notion_token = _get_secret("notion.token") or os.getenv("NOTION_TOKEN")
-    notion_block_id = _get_secret("notion.block_id") or os.getenv("NOTION_BLOCK_ID")
+    notion_block_id = _get_secret("notion.block_id") or os.getenv("NOTION_BLOCK_ID")  # 1 id ou "id1,id2,..." (uma seção por bloco)
     studies_db_id = _get_secret("notion.studies_db_id") or os.getenv("NOTION_STUDIES_DB_ID")  # opcional
 
     # Mercado
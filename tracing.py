@@ -0,0 +1,108 @@
+# tracing.py
+# Instrumentação leve do build do HUD: spans (context manager / decorator) com a duração de
+# cada etapa, agrupados num trace por build e gravados em JSON lines (.hud_cache/trace/spans.jsonl).
+# Fora de um trace ativo, span() não registra nada (custo ~zero). O trace ativo é por contexto
+# (contextvars): cada sessão/thread tem o seu; pools propagam com contextvars.copy_context().run.
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import json
+import os
+import threading
+import time
+import uuid
+
+from local_store import cache_path
+
+TRACE_NS = "trace"
+TRACE_LOG = "spans"
+TRACE_LOG_MAX_BYTES = 5 * 2**20  # >>> MANUAL INPUT (opcional): rotação simples do log (.1)
+
+_active: ContextVar[Optional["Trace"]] = ContextVar("hud_trace", default=None)
+
+class Trace:
+    """Um build do HUD: spans de todas as threads (Pipeline, feeds RSS) caem no mesmo trace."""
+    def __init__(self, name: str):
+        self.name = name
+        self.id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.total_ms: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self._t0 = time.perf_counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"trace": self.name, "id": self.id, "started_at": self.started_at,
+                "total_ms": self.total_ms, "spans": self.spans}
+
+@contextmanager
+def trace(name: str = "hud_build", log: bool = True):
+    """
+    Abre um trace (ou reaproveita o já ativo no contexto, p.ex. build_hud_context dentro de main.py).
+    Ao fechar o trace externo, grava uma linha JSON no log. Builds simultâneos (sessões do
+    Streamlit, refresher) têm cada um o seu trace.
+    """
+    outer = _active.get()
+    if outer is not None:
+        yield outer
+        return
+    tr = Trace(name)
+    token = _active.set(tr)
+    try:
+        yield tr
+    finally:
+        tr.total_ms = (time.perf_counter() - tr._t0) * 1000
+        _active.reset(token)
+        if log:
+            write_trace(tr)
+
+@contextmanager
+def span(name: str, **attrs):
+    """Mede o bloco e registra {name, start_ms, ms, thread, error, **attrs} no trace ativo."""
+    tr = _active.get()
+    if tr is None:
+        yield
+        return
+    t = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        tr.spans.append({
+            "name": name,
+            "start_ms": round((t - tr._t0) * 1000, 2),
+            "ms": round((time.perf_counter() - t) * 1000, 2),
+            "thread": threading.current_thread().name,
+            "error": error,
+            **attrs,
+        })
+
+def traced(fn: Callable) -> Callable:
+    """Decorator: span com o nome 'modulo.funcao'."""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    @wraps(fn)
+    def _wrapper(*args, **kwargs):
+        if _active.get() is None:
+            return fn(*args, **kwargs)
+        with span(name):
+            return fn(*args, **kwargs)
+    return _wrapper
+
+def current_spans() -> List[Dict[str, Any]]:
+    """Spans do trace ativo (lista viva) ou [] fora de um trace."""
+    tr = _active.get()
+    return tr.spans if tr is not None else []
+
+def write_trace(tr: Trace) -> None:
+    try:
+        path = cache_path(TRACE_NS, TRACE_LOG, "jsonl")
+        if os.path.exists(path) and os.path.getsize(path) > TRACE_LOG_MAX_BYTES:
+            os.replace(path, path + ".1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(tr.to_dict(), ensure_ascii=False, default=str) + "\n")
+    except Exception:
+        pass  # log é best-effort: nunca derruba o build
@@ -1,44 +1,100 @@
 # turtle.py
 from __future__ import annotations
+from typing import Dict, Optional
+import hashlib
+import numpy as np
 import pandas as pd
 import datetime as dt
 import unicodedata
 
+from local_store import read_frame, write_frame
+
+TURTLE_NS = "turtle"
+
 def _norm(s: str) -> str:
     s = str(s)
     s = "".join(c for c in unicodedata.normalize("NFD", s) if unicodedata.category(c) != "Mn")
     return s.strip().lower()
 
-def get_today_turtle_objective(load_sheet_fn, client, gsheet_id: str) -> str:
-    """Lê aba 'Turtle' e retorna objetivo do dia (ou último <= hoje)."""
+def _today() -> dt.date:
     try:
-        turtle = load_sheet_fn(client, gsheet_id, "Turtle")
+        from zoneinfo import ZoneInfo
+        return dt.datetime.now(ZoneInfo("America/Sao_Paulo")).date()
+    except Exception:
+        return dt.date.today()
+
+def _fingerprint(turtle: pd.DataFrame) -> str:
+    """Hash do conteúdo da aba (vetorizado; bem mais barato que re-parsear as datas)."""
+    h = hashlib.sha1(repr((list(turtle.columns), turtle.shape)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(turtle, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+class TurtleIndex:
+    """
+    Aba Turtle como vetores ordenados por data: `dates` (datetime64[D]) e `objectives`.
+    Datas repetidas mantêm a ordem da planilha (vale a última linha), como antes.
+    """
+    def __init__(self, dates: np.ndarray, objectives: np.ndarray, fingerprint: str = ""):
+        self.dates = dates
+        self.objectives = objectives
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def from_frame(cls, turtle: pd.DataFrame, fingerprint: str = "") -> "TurtleIndex":
+        empty = cls(np.array([], dtype="datetime64[D]"), np.array([], dtype=object), fingerprint)
         if turtle is None or turtle.empty:
-            return "-"
+            return empty
         name_map = {_norm(c): c for c in turtle.columns}
         date_col = next((name_map[k] for k in ("data","date","dia") if k in name_map), None)
         obj_col  = next((name_map[k] for k in ("objetivo","objective","goal","meta") if k in name_map), None)
         if not date_col or not obj_col:
-            return "-"
+            return empty
         s = turtle[date_col]
         if pd.api.types.is_numeric_dtype(s):
             dates = pd.to_datetime(s, unit="D", origin="1899-12-30", errors="coerce")
         else:
             dates = pd.to_datetime(s, errors="coerce", dayfirst=True)
-        try:
-            from zoneinfo import ZoneInfo
-            tz = ZoneInfo("America/Sao_Paulo")
-            today = dt.datetime.now(tz).date()
-        except Exception:
-            today = dt.date.today()
-        turtle["_date"] = dates.dt.date
-        valid = turtle.dropna(subset=["_date"])
-        row = valid.loc[valid["_date"] == today]
-        if row.empty:
-            row = valid.loc[valid["_date"] <= today].sort_values("_date")
-            if row.empty:
-                return "-"
-        objetivo_val = str(row.iloc[-1][obj_col]).strip()
+        days = dates.dt.normalize().to_numpy(dtype="datetime64[D]")
+        objectives = turtle[obj_col].to_numpy(dtype=object)
+        valid = ~np.isnat(days)
+        days, objectives = days[valid], objectives[valid]
+        order = np.argsort(days, kind="stable")
+        return cls(days[order], objectives[order], fingerprint)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def lookup(self, day: dt.date) -> str:
+        """Objetivo do dia (ou o último <= day) — busca binária, O(log n)."""
+        i = int(self.dates.searchsorted(np.datetime64(day, "D"), side="right")) - 1
+        if i < 0:
+            return "-"
+        objetivo_val = str(self.objectives[i]).strip()
         return objetivo_val if objetivo_val and objetivo_val.lower() not in {"nan","none"} else "-"
+
+# Índice por planilha (memória do processo + disco); refeito só quando a aba muda
+_INDEX: Dict[str, TurtleIndex] = {}
+
+def turtle_index(turtle: pd.DataFrame, key: str = "") -> TurtleIndex:
+    fp = _fingerprint(turtle)
+    idx = _INDEX.get(key)
+    if idx is None or idx.fingerprint != fp:
+        disk = read_frame(TURTLE_NS, key) if key else None
+        if isinstance(disk, TurtleIndex) and disk.fingerprint == fp:
+            idx = disk
+        else:
+            idx = TurtleIndex.from_frame(turtle, fp)
+            if key:
+                write_frame(TURTLE_NS, key, idx)
+        _INDEX[key] = idx
+    return idx
+
+def get_today_turtle_objective(load_sheet_fn, client, gsheet_id: str, today: Optional[dt.date] = None) -> str:
+    """Lê aba 'Turtle' e retorna objetivo do dia (ou último <= hoje)."""
+    try:
+        turtle = load_sheet_fn(client, gsheet_id, "Turtle")
+        if turtle is None or turtle.empty:
+            return "-"
+        return turtle_index(turtle, gsheet_id).lookup(today or _today())
     except Exception:
         return "-"